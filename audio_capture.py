@@ -0,0 +1,204 @@
+import numpy as np
+import sounddevice as sd
+from typing import Optional, List
+
+
+class RingBuffer:
+    """
+    Buffer circular de tamaño fijo para muestras de audio mono.
+
+    Está pensado para un único escritor (el callback de audio) y lectores
+    ocasionales: el escritor copia los datos y solo después publica el nuevo
+    índice, por lo que no necesita locks en el hilo de audio.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        """
+        Inicializa el buffer.
+
+        Args:
+            capacity: Número máximo de muestras que conserva el buffer.
+            dtype: Tipo de dato de las muestras.
+        """
+        if capacity <= 0:
+            raise ValueError("La capacidad del buffer debe ser mayor que 0")
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=dtype)
+        # Total de muestras escritas desde el inicio (solo lo modifica el escritor)
+        self._written = 0
+
+    def write(self, samples: np.ndarray):
+        """
+        Añade muestras al buffer, sobrescribiendo las más antiguas.
+
+        Args:
+            samples: Muestras a añadir.
+        """
+        n = len(samples)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = self._written % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self._data[start:end] = samples
+        else:
+            first = self.capacity - start
+            self._data[start:] = samples[:first]
+            self._data[:n - first] = samples[first:]
+        # Publicar el nuevo índice solo después de copiar los datos
+        self._written += n
+
+    def latest(self, n: int) -> np.ndarray:
+        """
+        Devuelve una copia de las últimas `n` muestras escritas.
+
+        Args:
+            n: Número de muestras solicitadas.
+
+        Returns:
+            Array con como máximo `n` muestras, en orden cronológico.
+        """
+        written = self._written
+        n = min(n, self.capacity, written)
+        if n <= 0:
+            return np.zeros(0, dtype=self._data.dtype)
+
+        end = written % self.capacity
+        start = end - n
+        if start >= 0:
+            return self._data[start:end].copy()
+        return np.concatenate((self._data[start:], self._data[:end]))
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+
+class _Take:
+    # Estado de una grabación. El callback de audio solo añade a `chunks` de la
+    # grabación que lee en cada bloque, así que iniciar o detener consiste en
+    # sustituir el objeto completo (una asignación atómica) sin usar locks.
+    __slots__ = ("chunks", "pre_roll_samples")
+
+    def __init__(self, pre_roll_samples: int):
+        self.chunks: List[np.ndarray] = []
+        self.pre_roll_samples = pre_roll_samples
+
+
+class PersistentCapture:
+    """
+    Captura de micrófono siempre abierta. El stream se abre una sola vez y
+    alimenta un buffer circular; al iniciar una grabación se antepone el
+    audio de pre-roll tomado del buffer, de modo que no se pierde la primera
+    sílaba ni se paga la latencia de apertura del dispositivo.
+    """
+
+    def __init__(self, sample_rate: int = 44100, pre_roll_ms: int = 300, buffer_seconds: float = 2.0):
+        """
+        Inicializa la captura persistente (sin abrir todavía el dispositivo).
+
+        Args:
+            sample_rate: Frecuencia de muestreo en Hz.
+            pre_roll_ms: Milisegundos de audio previos al inicio de la grabación que se incluyen.
+            buffer_seconds: Segundos de audio que conserva el buffer circular.
+        """
+        self.sample_rate = sample_rate
+        self.pre_roll_ms = pre_roll_ms
+        self.ring = RingBuffer(int(sample_rate * buffer_seconds))
+        self.stream = None
+        # Grabación en curso (None si no se está grabando)
+        self._take: Optional[_Take] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.stream is not None
+
+    @property
+    def recording(self) -> bool:
+        return self._take is not None
+
+    def _callback(self, indata, frames, time, status):
+        if status:
+            print(status)
+        samples = indata[:, 0]
+
+        # La grabación se lee una sola vez por bloque. El pre-roll se toma en el
+        # propio hilo de audio, antes de escribir el bloque actual, para que no
+        # haya huecos ni muestras duplicadas
+        take = self._take
+        if take is not None:
+            if take.pre_roll_samples:
+                pre_roll = self.ring.latest(take.pre_roll_samples)
+                if len(pre_roll):
+                    take.chunks.append(pre_roll)
+                take.pre_roll_samples = 0
+            take.chunks.append(samples.copy())
+
+        self.ring.write(samples)
+
+    def open(self):
+        """
+        Abre el stream de entrada y empieza a llenar el buffer circular.
+        """
+        if self.stream is not None:
+            return
+        self.stream = sd.InputStream(
+            channels=1,
+            samplerate=self.sample_rate,
+            dtype='float32',
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def close(self):
+        """
+        Detiene y cierra el stream de entrada.
+        """
+        if self.stream is None:
+            return
+        self._take = None
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+
+    def start_recording(self, pre_roll_ms: Optional[int] = None):
+        """
+        Empieza a acumular audio sin reabrir el dispositivo.
+
+        Args:
+            pre_roll_ms: Pre-roll para esta grabación (por defecto el configurado).
+        """
+        if self.stream is None:
+            self.open()
+        if pre_roll_ms is not None:
+            self.pre_roll_ms = pre_roll_ms
+        self._take = _Take(int(self.sample_rate * self.pre_roll_ms / 1000))
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Devuelve una copia de lo grabado hasta ahora sin detener la grabación.
+
+        Returns:
+            Array con las muestras grabadas hasta el momento.
+        """
+        take = self._take
+        chunks = list(take.chunks) if take is not None else []
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(chunks)
+
+    def stop_recording(self) -> np.ndarray:
+        """
+        Deja de acumular audio y devuelve lo grabado (incluido el pre-roll).
+
+        Returns:
+            Array con las muestras grabadas.
+        """
+        take, self._take = self._take, None
+        chunks = list(take.chunks) if take is not None else []
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(chunks)
@@ -1,46 +1,245 @@
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
 
 
-class AudioController:
+class VolumeBackend:
+    # Interfaz para controlar el volumen maestro del sistema (0-100)
+    name = "base"
+
+    def get_volume(self):
+        raise NotImplementedError
+
+    def set_volume(self, vol_percent):
+        raise NotImplementedError
+
+    def set_mute(self, muted):
+        raise NotImplementedError
+
+
+class PycawVolumeBackend(VolumeBackend):
+    # Backend de Windows basado en pycaw/COM
+    name = "pycaw"
+
     def __init__(self):
-        # Inicializar el controlador de volumen usando pycaw
+        from ctypes import cast, POINTER
+        import comtypes
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+
+        # COM debe inicializarse en el hilo que usa la interfaz
+        comtypes.CoInitialize()
         devices = AudioUtilities.GetSpeakers()
         interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
         self.volume = cast(interface, POINTER(IAudioEndpointVolume))
+
+    def get_volume(self):
+        return self.volume.GetMasterVolumeLevelScalar() * 100
+
+    def set_volume(self, vol_percent):
+        self.volume.SetMasterVolumeLevelScalar(vol_percent / 100, None)
+
+    def set_mute(self, muted):
+        self.volume.SetMute(1 if muted else 0, None)
+
+
+class PulseAudioVolumeBackend(VolumeBackend):
+    # Backend de Linux que usa pactl (PulseAudio o PipeWire con pipewire-pulse)
+    name = "pulseaudio"
+    SINK = "@DEFAULT_SINK@"
+
+    def __init__(self):
+        if not shutil.which("pactl"):
+            raise RuntimeError("No se encontró pactl en el sistema")
+
+    def _run(self, *args):
+        return subprocess.run(["pactl", *args], capture_output=True, text=True, check=True).stdout
+
+    def get_volume(self):
+        # Ejemplo: "Volume: front-left: 42597 /  65% / -11.23 dB, ..."
+        match = re.search(r"(\d+)%", self._run("get-sink-volume", self.SINK))
+        if not match:
+            raise RuntimeError("No se pudo leer el volumen de pactl")
+        return float(match.group(1))
+
+    def set_volume(self, vol_percent):
+        self._run("set-sink-volume", self.SINK, f"{round(vol_percent)}%")
+
+    def set_mute(self, muted):
+        self._run("set-sink-mute", self.SINK, "1" if muted else "0")
+
+
+class PipeWireVolumeBackend(VolumeBackend):
+    # Backend de Linux que usa wpctl (WirePlumber/PipeWire)
+    name = "pipewire"
+    SINK = "@DEFAULT_AUDIO_SINK@"
+
+    def __init__(self):
+        if not shutil.which("wpctl"):
+            raise RuntimeError("No se encontró wpctl en el sistema")
+
+    def _run(self, *args):
+        return subprocess.run(["wpctl", *args], capture_output=True, text=True, check=True).stdout
+
+    def get_volume(self):
+        # Ejemplo: "Volume: 0.65" o "Volume: 0.65 [MUTED]"
+        match = re.search(r"Volume:\s*([\d.]+)", self._run("get-volume", self.SINK))
+        if not match:
+            raise RuntimeError("No se pudo leer el volumen de wpctl")
+        return float(match.group(1)) * 100
+
+    def set_volume(self, vol_percent):
+        self._run("set-volume", self.SINK, f"{vol_percent / 100:.2f}")
+
+    def set_mute(self, muted):
+        self._run("set-mute", self.SINK, "1" if muted else "0")
+
+
+class FakeVolumeBackend(VolumeBackend):
+    # Backend en memoria para pruebas y para medir el camino de grabación
+    name = "fake"
+
+    def __init__(self, volume=50.0, latency=0.0):
+        self.volume = volume
+        self.muted = False
+        self.latency = latency  # Retardo artificial por operación en segundos
+        self.calls = []
+
+    def _simulate(self, call):
+        self.calls.append(call)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_volume(self):
+        self._simulate(("get_volume",))
+        return self.volume
+
+    def set_volume(self, vol_percent):
+        self._simulate(("set_volume", vol_percent))
+        self.volume = vol_percent
+
+    def set_mute(self, muted):
+        self._simulate(("set_mute", muted))
+        self.muted = muted
+
+
+VOLUME_BACKENDS = {
+    PycawVolumeBackend.name: PycawVolumeBackend,
+    PulseAudioVolumeBackend.name: PulseAudioVolumeBackend,
+    PipeWireVolumeBackend.name: PipeWireVolumeBackend,
+    FakeVolumeBackend.name: FakeVolumeBackend,
+}
+
+
+def create_volume_backend(name=None):
+    # Crear el backend indicado o detectar el adecuado para el sistema.
+    # También se puede elegir con la variable de entorno VOICE_TO_CURSOR_AUDIO_BACKEND.
+    name = name or os.getenv("VOICE_TO_CURSOR_AUDIO_BACKEND")
+    if name:
+        if name not in VOLUME_BACKENDS:
+            raise ValueError(f"Backend de audio desconocido: {name}")
+        return VOLUME_BACKENDS[name]()
+
+    if sys.platform == "win32":
+        return PycawVolumeBackend()
+    if shutil.which("wpctl"):
+        return PipeWireVolumeBackend()
+    if shutil.which("pactl"):
+        return PulseAudioVolumeBackend()
+
+    print("No se encontró control de volumen del sistema; se usará un backend en memoria")
+    return FakeVolumeBackend()
+
+
+class AudioController:
+    def __init__(self, backend=None, duck_level=0.0):
+        # Todas las operaciones se ejecutan en un único hilo de trabajo: así
+        # silenciar/restaurar no bloquea la interfaz, se conserva el orden de
+        # las operaciones y COM se usa siempre desde el mismo hilo.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-ctrl")
+        self._backend = backend
+        self._backend_name = None if isinstance(backend, VolumeBackend) else backend
+        # Fracción del volumen original que se mantiene al silenciar (0 = silencio total)
+        self.duck_level = duck_level
         self.original_volume = None
+        self.was_muted_for_duck = False
+        # Crear el backend en segundo plano para que esté listo al grabar
+        self._executor.submit(self._get_backend)
+
+    def _get_backend(self):
+        if not isinstance(self._backend, VolumeBackend):
+            self._backend = create_volume_backend(self._backend_name)
+        return self._backend
+
+    def _call(self, func, *args):
+        # Ejecutar en el hilo de trabajo y esperar el resultado
+        return self._executor.submit(func, *args).result()
+
+    @property
+    def backend(self):
+        return self._call(self._get_backend)
 
     def get_volume(self):
         # Obtener el volumen actual del sistema como porcentaje (0-100)
-        return self.volume.GetMasterVolumeLevelScalar() * 100
+        return self._call(lambda: self._get_backend().get_volume())
 
     def set_volume(self, vol_percent):
         # Establecer el volumen del sistema a un porcentaje dado (0-100)
         if vol_percent < 0 or vol_percent > 100:
             raise ValueError("El volumen debe estar entre 0 y 100")
-        self.volume.SetMasterVolumeLevelScalar(vol_percent / 100, None)
+        self._call(lambda: self._get_backend().set_volume(vol_percent))
 
     def mute(self):
         # Silenciar el sonido del sistema
-        self.volume.SetMute(1, None)
+        self._call(lambda: self._get_backend().set_mute(True))
 
     def unmute(self):
         # Reactivar el sonido del sistema
-        self.volume.SetMute(0, None)
+        self._call(lambda: self._get_backend().set_mute(False))
+
+    def _silence(self):
+        backend = self._get_backend()
+        self.original_volume = backend.get_volume()
+        if self.duck_level > 0:
+            # Atenuación parcial: bajar el volumen en lugar de silenciar
+            backend.set_volume(self.original_volume * self.duck_level)
+            self.was_muted_for_duck = False
+        else:
+            backend.set_mute(True)
+            self.was_muted_for_duck = True
+
+    def _restore(self):
+        if self.original_volume is not None:
+            backend = self._get_backend()
+            if self.was_muted_for_duck:
+                backend.set_mute(False)
+            backend.set_volume(self.original_volume)
+            self.original_volume = None
 
     def silence(self):
-        # Guardar el volumen actual y silenciar el sistema
-        self.original_volume = self.get_volume()
-        self.mute()
+        # Guardar el volumen actual y silenciar (o atenuar) el sistema
+        self._call(self._silence)
 
     def restore(self):
         # Restaurar el volumen original y reactivar el sonido
-        if self.original_volume is not None:
-            self.unmute()
-            self.set_volume(self.original_volume)
-            self.original_volume = None
+        self._call(self._restore)
+
+    def silence_async(self) -> Future:
+        # Igual que silence() pero sin esperar: permite abrir el stream en paralelo
+        return self._executor.submit(self._silence)
+
+    def restore_async(self) -> Future:
+        # Igual que restore() pero sin esperar: permite cerrar el stream en paralelo
+        return self._executor.submit(self._restore)
 
     def set_default_volume(self, default_volume=50.0):
         # Establecer el volumen del sistema a un nivel predeterminado
-        self.set_volume(default_volume) 
\ No newline at end of file
+        self.set_volume(default_volume)
+
+    def close(self):
+        # Esperar a las operaciones pendientes y liberar el hilo de trabajo
+        self._executor.shutdown(wait=True)
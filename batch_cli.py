@@ -0,0 +1,294 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set
+
+from dotenv import load_dotenv
+
+from gpt_audio_processor import GPTAudioProcessor, CURSOR_SYSTEM_MESSAGE, CURSOR_PROMPT_TEMPLATE
+from polish_batcher import PolishBatcher
+from transcription_backends import get_available_backends
+
+# Extensiones de audio aceptadas al recorrer directorios
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.ogg', '.flac', '.webm', '.mp4', '.mpeg', '.mpga']
+
+
+def collect_audio_files(inputs: List[str], recursive: bool = False) -> List[str]:
+    """
+    Obtiene la lista de archivos de audio a partir de directorios, patrones glob o rutas.
+
+    Args:
+        inputs: Lista de directorios, patrones glob o archivos.
+        recursive: Si se deben recorrer los subdirectorios.
+
+    Returns:
+        Lista ordenada y sin duplicados de rutas absolutas a archivos de audio.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for root, _dirs, names in os.walk(item):
+                    files.extend(os.path.join(root, name) for name in names)
+            else:
+                files.extend(os.path.join(item, name) for name in os.listdir(item))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            files.extend(glob.glob(item, recursive=recursive))
+
+    audio_files = {
+        os.path.abspath(f) for f in files
+        if os.path.isfile(f) and os.path.splitext(f)[1].lower() in AUDIO_EXTENSIONS
+    }
+    return sorted(audio_files)
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """
+    Lee un archivo JSONL de resultados previo para reanudar el procesamiento.
+
+    Args:
+        output_path: Ruta al archivo JSONL de salida.
+
+    Returns:
+        Conjunto de rutas de archivos ya procesados correctamente.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Línea truncada por una interrupción previa: se reprocesa
+                continue
+            if record.get("status") == "ok":
+                completed.add(record.get("file"))
+    return completed
+
+
+def get_audio_duration(audio_file: str) -> Optional[float]:
+    """
+    Obtiene la duración en segundos de un archivo WAV.
+
+    Args:
+        audio_file: Ruta al archivo de audio.
+
+    Returns:
+        Duración en segundos, o None si el formato no es WAV o no se puede leer.
+    """
+    try:
+        with wave.open(audio_file, 'rb') as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def run_batch(processor: GPTAudioProcessor,
+              audio_files: List[str],
+              output_path: str,
+              concurrency: int = 4,
+              resume: bool = True,
+              progress: bool = True,
+              polish_batcher: Optional[PolishBatcher] = None,
+              **process_kwargs) -> Dict[str, Any]:
+    """
+    Procesa una lista de archivos de audio con concurrencia limitada y
+    escribe un registro JSONL por archivo a medida que terminan.
+    Ante Ctrl-C se cancelan los archivos que aún no han empezado y se guardan
+    los que estaban en curso.
+
+    Args:
+        processor: Procesador de audio a utilizar.
+        audio_files: Lista de rutas a archivos de audio.
+        output_path: Ruta al archivo JSONL de salida (se añade al final).
+        concurrency: Número máximo de archivos procesados simultáneamente.
+        resume: Si se deben omitir los archivos ya procesados en `output_path`.
+        progress: Si se debe mostrar el progreso por stderr.
+        polish_batcher: Agrupador opcional; si se indica, el pulido de varios archivos
+                        se combina en una sola petición de chat.
+        **process_kwargs: Parámetros para `GPTAudioProcessor.process_audio`.
+
+    Returns:
+        Diccionario con estadísticas de la ejecución y de rendimiento.
+    """
+    completed = load_completed(output_path) if resume else set()
+    pending = [f for f in audio_files if f not in completed]
+
+    stats = {
+        "total": len(audio_files),
+        "skipped": len(audio_files) - len(pending),
+        "ok": 0,
+        "errors": 0,
+        "audio_seconds": 0.0,
+        "elapsed": 0.0,
+    }
+    lock = threading.Lock()
+
+    def process_one(audio_file: str) -> Dict[str, Any]:
+        duration = get_audio_duration(audio_file)
+        start = time.perf_counter()
+        record = {"file": audio_file, "audio_seconds": duration}
+        try:
+            if polish_batcher is None:
+                record["text"] = processor.process_audio(audio_file=audio_file, **process_kwargs)
+            else:
+                transcribed_text = processor.transcribe_audio(
+                    audio_file,
+                    model=process_kwargs.get("transcription_model", GPTAudioProcessor.WHISPER_MODEL),
+                    language=process_kwargs.get("transcription_language"),
+                    prompt=process_kwargs.get("transcription_prompt")
+                )
+                record["text"] = polish_batcher.polish(transcribed_text)
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["latency"] = round(time.perf_counter() - start, 3)
+        record["timestamp"] = datetime.now().isoformat(timespec="seconds")
+        return record
+
+    def write_record(out, record: Dict[str, Any]):
+        with lock:
+            # Escribir y vaciar cada línea para poder reanudar tras una interrupción
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["status"] == "ok":
+                stats["ok"] += 1
+                stats["audio_seconds"] += record["audio_seconds"] or 0.0
+            else:
+                stats["errors"] += 1
+            if progress:
+                done = stats["ok"] + stats["errors"]
+                print(f"[{done}/{len(pending)}] {record['status']}: {record['file']}",
+                      file=sys.stderr)
+
+    start_time = time.perf_counter()
+    interrupted = False
+    with open(output_path, 'a', encoding='utf-8') as out:
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        futures = []
+        written = set()
+        try:
+            futures = [executor.submit(process_one, f) for f in pending]
+            for future in as_completed(futures):
+                write_record(out, future.result())
+                written.add(future)
+        except KeyboardInterrupt:
+            # No lanzar más llamadas a la API: cancelar lo que aún no ha empezado
+            interrupted = True
+            for future in futures:
+                future.cancel()
+            if progress:
+                print("Interrumpido: esperando a los archivos en curso...", file=sys.stderr)
+        finally:
+            executor.shutdown(wait=True)
+
+        # Guardar también los archivos que terminaron tras la interrupción,
+        # para que --resume no vuelva a procesarlos
+        for future in futures:
+            if future not in written and not future.cancelled():
+                write_record(out, future.result())
+
+    stats["interrupted"] = interrupted
+    elapsed = time.perf_counter() - start_time
+    processed = stats["ok"] + stats["errors"]
+    stats["elapsed"] = round(elapsed, 3)
+    stats["files_per_minute"] = round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0
+    stats["audio_seconds_per_second"] = round(stats["audio_seconds"] / elapsed, 2) if elapsed > 0 else 0.0
+    return stats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Transcribe y pule grabaciones por lotes sin interfaz gráfica."
+    )
+    parser.add_argument("inputs", nargs="+", help="Directorios, patrones glob o archivos de audio")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="Archivo JSONL de salida")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="Archivos procesados en paralelo")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Recorrer subdirectorios")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocesar archivos ya presentes en la salida")
+    parser.add_argument("--backend", default="openai", choices=get_available_backends(),
+                        help="Motor de transcripción")
+    parser.add_argument("--transcription-model", default=GPTAudioProcessor.WHISPER_MODEL,
+                        help="Modelo de transcripción")
+    parser.add_argument("--process-model", default="gpt-3.5-turbo", help="Modelo GPT para pulir el texto")
+    parser.add_argument("--language", default="es", help="Código de idioma (vacío para autodetectar)")
+    parser.add_argument("--prompt-file", help="Archivo con el prompt de transcripción")
+    parser.add_argument("--batch-window-ms", type=int, default=0,
+                        help="Agrupar el pulido de textos que lleguen dentro de esta ventana (0 = desactivado)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No mostrar el progreso")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+
+    audio_files = collect_audio_files(args.inputs, recursive=args.recursive)
+    if not audio_files:
+        print("No se encontraron archivos de audio.", file=sys.stderr)
+        return 1
+
+    transcription_prompt = None
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as f:
+            transcription_prompt = f.read().strip() or None
+
+    processor = GPTAudioProcessor()
+    processor.set_transcription_backend(args.backend)
+
+    polish_batcher = None
+    if args.batch_window_ms > 0:
+        polish_batcher = PolishBatcher(
+            processor,
+            process_model=args.process_model,
+            system_message=CURSOR_SYSTEM_MESSAGE,
+            prompt_template=CURSOR_PROMPT_TEMPLATE,
+            tag_name="text_to_cursor",
+            window_ms=args.batch_window_ms
+        )
+
+    stats = run_batch(
+        processor,
+        audio_files,
+        args.output,
+        concurrency=args.concurrency,
+        resume=not args.no_resume,
+        progress=not args.quiet,
+        polish_batcher=polish_batcher,
+        transcription_model=args.transcription_model,
+        process_model=args.process_model,
+        system_message=CURSOR_SYSTEM_MESSAGE,
+        prompt_template=CURSOR_PROMPT_TEMPLATE,
+        tag_name="text_to_cursor",
+        clean_response=True,
+        transcription_prompt=transcription_prompt,
+        transcription_language=args.language or None
+    )
+
+    if polish_batcher is not None:
+        polish_batcher.close()
+        stats["batching"] = polish_batcher.get_stats()
+
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    if stats["interrupted"]:
+        return 130
+    return 0 if stats["errors"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+from typing import Optional, Callable, Tuple, List, Any
+
+
+class CursorPositionSource:
+    """
+    Interfaz para obtener la posición del cursor.
+    """
+
+    def position(self) -> Tuple[int, int]:
+        """
+        Devuelve la posición actual del cursor.
+
+        Returns:
+            Tupla (x, y) en coordenadas de pantalla.
+        """
+        raise NotImplementedError
+
+
+class PyAutoGUIPositionSource(CursorPositionSource):
+    """
+    Fuente de posición basada en pyautogui.
+    """
+
+    def position(self) -> Tuple[int, int]:
+        import pyautogui
+        x, y = pyautogui.position()
+        return int(x), int(y)
+
+
+class FakePositionSource(CursorPositionSource):
+    """
+    Fuente de posición para pruebas: devuelve posiciones predefinidas en
+    orden y repite la última cuando se agotan.
+    """
+
+    def __init__(self, positions: List[Tuple[int, int]]):
+        if not positions:
+            raise ValueError("Se necesita al menos una posición")
+        self.positions = list(positions)
+        self.calls = 0
+
+    def position(self) -> Tuple[int, int]:
+        index = min(self.calls, len(self.positions) - 1)
+        self.calls += 1
+        return self.positions[index]
+
+
+class CursorTracker:
+    """
+    Seguimiento de la posición del cursor con sondeo adaptativo.
+
+    El intervalo vuelve al mínimo cuando el cursor se mueve y crece de forma
+    geométrica mientras está quieto. Con la ventana oculta no se consulta la
+    posición, y mientras está en pausa (grabación, procesamiento) no se
+    programa ningún sondeo. `on_change` solo se llama si la posición cambia.
+    """
+
+    def __init__(self,
+                 source: CursorPositionSource,
+                 on_change: Callable[[int, int], None],
+                 schedule: Callable[[int, Callable[[], None]], Any],
+                 cancel: Callable[[Any], None],
+                 is_visible: Optional[Callable[[], bool]] = None,
+                 min_interval_ms: int = 50,
+                 max_interval_ms: int = 1000,
+                 hidden_interval_ms: int = 2000,
+                 backoff: float = 1.5):
+        """
+        Inicializa el seguimiento (sin iniciarlo).
+
+        Args:
+            source: Fuente de la posición del cursor.
+            on_change: Función llamada con (x, y) cuando cambia la posición.
+            schedule: Función (milisegundos, callback) que programa una llamada y devuelve un identificador
+                      (por ejemplo `root.after`).
+            cancel: Función que cancela una llamada programada (por ejemplo `root.after_cancel`).
+            is_visible: Función que indica si la ventana está visible. Por defecto se asume visible.
+            min_interval_ms: Intervalo de sondeo mientras el cursor se mueve.
+            max_interval_ms: Intervalo máximo de sondeo con el cursor quieto.
+            hidden_interval_ms: Intervalo de comprobación con la ventana oculta.
+            backoff: Factor de crecimiento del intervalo con el cursor quieto.
+        """
+        self.source = source
+        self.on_change = on_change
+        self.schedule = schedule
+        self.cancel = cancel
+        self.is_visible = is_visible or (lambda: True)
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.hidden_interval_ms = hidden_interval_ms
+        self.backoff = backoff
+
+        self.interval_ms = min_interval_ms
+        self.last_position: Optional[Tuple[int, int]] = None
+        self.polls = 0
+        self.redraws = 0
+        self._job = None
+        self._running = False
+        self._paused = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def start(self):
+        """Inicia el seguimiento."""
+        if self._running:
+            return
+        self._running = True
+        self.interval_ms = self.min_interval_ms
+        if not self._paused:
+            self._schedule(0)
+
+    def stop(self):
+        """Detiene el seguimiento."""
+        self._running = False
+        self._cancel()
+
+    def pause(self):
+        """Suspende el sondeo por completo hasta llamar a `resume`."""
+        self._paused = True
+        self._cancel()
+
+    def resume(self):
+        """Reanuda el sondeo tras una pausa."""
+        if not self._paused:
+            return
+        self._paused = False
+        if self._running:
+            self.interval_ms = self.min_interval_ms
+            self._schedule(0)
+
+    def _schedule(self, delay_ms: int):
+        self._cancel()
+        self._job = self.schedule(int(delay_ms), self.tick)
+
+    def _cancel(self):
+        if self._job is not None:
+            self.cancel(self._job)
+            self._job = None
+
+    def tick(self):
+        """Realiza un sondeo y programa el siguiente según la actividad."""
+        self._job = None
+        if not self._running or self._paused:
+            return
+
+        if not self.is_visible():
+            # Ventana oculta o minimizada: no consultar la posición
+            self.interval_ms = self.min_interval_ms
+            self._schedule(self.hidden_interval_ms)
+            return
+
+        self.polls += 1
+        try:
+            position = self.source.position()
+        except Exception as e:
+            print(f"Error al obtener posición del cursor: {e}")
+            position = self.last_position
+
+        if position != self.last_position:
+            self.last_position = position
+            self.redraws += 1
+            self.on_change(*position)
+            self.interval_ms = self.min_interval_ms
+        else:
+            self.interval_ms = min(self.max_interval_ms, int(self.interval_ms * self.backoff) + 1)
+
+        self._schedule(self.interval_ms)
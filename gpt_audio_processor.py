@@ -2,6 +2,11 @@ import os
 import openai
 import re
 from typing import Optional, Dict, Any, BinaryIO, Union, List
+from transcription_backends import TranscriptionBackend, OpenAITranscriptionBackend, create_backend
+
+# Mensajes usados para pulir dictados como prompts de Cursor
+CURSOR_SYSTEM_MESSAGE = "Eres un asistente que ayuda a pulir y mejorar textos para usarlos como prompts en Cursor."
+CURSOR_PROMPT_TEMPLATE = "Por favor, pulir y mejorar el siguiente texto para usarlo como prompt en Cursor: {text}"
 
 class GPTAudioProcessor:
     """
@@ -13,12 +18,13 @@ class GPTAudioProcessor:
     WHISPER_MODEL = "whisper-1"
     GPT4O_MINI_TRANSCRIBE = "gpt-4o-mini-transcribe"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, transcription_backend: Optional[TranscriptionBackend] = None):
         """
         Inicializa el procesador de audio con GPT.
         
         Args:
             api_key: API key de OpenAI. Si no se proporciona, se intentará cargar de las variables de entorno.
+            transcription_backend: Backend de transcripción a utilizar. Por defecto se usa la API de OpenAI.
         """
         # Usar la API key proporcionada o intentar cargarla de las variables de entorno
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
@@ -27,6 +33,28 @@ class GPTAudioProcessor:
         
         # Inicializar cliente de OpenAI
         self.client = openai.OpenAI(api_key=self.api_key)
+        
+        # Backend de transcripción (OpenAI por defecto)
+        self.transcription_backend = transcription_backend or OpenAITranscriptionBackend(self.client)
+    
+    def set_transcription_backend(self, backend: Union[str, TranscriptionBackend], **kwargs) -> TranscriptionBackend:
+        """
+        Cambia el backend de transcripción.
+        
+        Args:
+            backend: Instancia de backend o nombre registrado ("openai", "local", "fake").
+            **kwargs: Argumentos para el constructor si se indica un nombre.
+            
+        Returns:
+            El backend activo tras el cambio.
+        """
+        if isinstance(backend, str):
+            if backend == OpenAITranscriptionBackend.name:
+                backend = OpenAITranscriptionBackend(self.client)
+            else:
+                backend = create_backend(backend, **kwargs)
+        self.transcription_backend = backend
+        return backend
     
     def transcribe_audio(self, 
                          audio_file: Union[str, BinaryIO], 
@@ -50,67 +78,65 @@ class GPTAudioProcessor:
         Returns:
             Texto transcrito del audio.
         """
-        # Si audio_file es una ruta de archivo, abrirlo
-        file_obj = None
-        try:
-            if isinstance(audio_file, str):
-                file_obj = open(audio_file, "rb")
-                file_to_use = file_obj
-            else:
-                file_to_use = audio_file
-                
-            # Preparar los parámetros para la transcripción
-            params = {
-                "model": model,
-                "file": file_to_use,
-                "response_format": response_format
-            }
-            
-            # Añadir parámetros opcionales si se proporcionan
-            if language:
-                params["language"] = language
-            if prompt:
-                params["prompt"] = prompt
-            if temperature is not None:
-                params["temperature"] = temperature
-                
-            # Realizar la transcripción
-            transcript = self.client.audio.transcriptions.create(**params)
+        return self.transcription_backend.transcribe(
+            audio_file,
+            model=model,
+            language=language,
+            prompt=prompt,
+            response_format=response_format,
+            temperature=temperature
+        )
+    
+    async def transcribe_audio_async(self,
+                                     audio_file: Union[str, BinaryIO],
+                                     model: str = WHISPER_MODEL,
+                                     language: Optional[str] = None,
+                                     prompt: Optional[str] = None) -> str:
+        """
+        Versión asíncrona de `transcribe_audio`.
+        
+        Args:
+            audio_file: Ruta al archivo de audio o archivo abierto en modo binario.
+            model: Modelo a utilizar para la transcripción.
+            language: Código de idioma opcional.
+            prompt: Texto opcional para guiar la transcripción.
             
-            # Manejar diferentes tipos de respuesta
-            if response_format == "text":
-                # En formato text, el objeto transcript puede ser directamente un string o tener un atributo text
-                if hasattr(transcript, 'text'):
-                    return transcript.text
-                elif isinstance(transcript, str):
-                    return transcript
-                else:
-                    # Intentar convertir a string como último recurso
-                    return str(transcript)
-            elif response_format == "json":
-                # En formato json, puede venir como un objeto con atributo text o un diccionario
-                if hasattr(transcript, 'text'):
-                    return transcript.text
-                elif isinstance(transcript, dict) and 'text' in transcript:
-                    return transcript['text']
-                else:
-                    # Intentar convertir a string como último recurso
-                    return str(transcript)
-            else:
-                # Para otros formatos, intentar obtener el texto de la mejor manera posible
-                if hasattr(transcript, 'text'):
-                    return transcript.text
-                elif isinstance(transcript, str):
-                    return transcript
-                elif isinstance(transcript, dict) and 'text' in transcript:
-                    return transcript['text']
-                else:
-                    return str(transcript)
+        Returns:
+            Texto transcrito del audio.
+        """
+        return await self.transcription_backend.transcribe_async(
+            audio_file,
+            model=model,
+            language=language,
+            prompt=prompt
+        )
+    
+    def transcribe_batch(self,
+                         audio_files: List[Union[str, BinaryIO]],
+                         model: str = WHISPER_MODEL,
+                         language: Optional[str] = None,
+                         prompt: Optional[str] = None,
+                         max_workers: int = 4) -> List[str]:
+        """
+        Transcribe varios archivos de audio de forma concurrente.
+        
+        Args:
+            audio_files: Lista de rutas o archivos abiertos en modo binario.
+            model: Modelo a utilizar para la transcripción.
+            language: Código de idioma opcional.
+            prompt: Texto opcional para guiar la transcripción.
+            max_workers: Número máximo de transcripciones simultáneas.
             
-        finally:
-            # Cerrar el archivo si lo abrimos aquí
-            if file_obj:
-                file_obj.close()
+        Returns:
+            Lista de textos transcritos, en el mismo orden que `audio_files`.
+        """
+        return self.transcription_backend.transcribe_batch(
+            audio_files,
+            max_workers=max_workers,
+            model=model,
+            language=language,
+            prompt=prompt
+        )
     
     def process_text_with_gpt(self, 
                              text: str, 
@@ -187,6 +213,32 @@ class GPTAudioProcessor:
         # Si no encontramos las etiquetas, devolvemos el texto original pero limpio
         return text.strip()
     
+    def _extract_numbered_sections(self, text: str, tag_name: str) -> Dict[int, str]:
+        """
+        Extrae las secciones numeradas de una respuesta por lotes.
+        Tolera variaciones de formato: mayúsculas, espacios, comillas en el id,
+        etiquetas de cierre con o sin id y secciones sin cerrar.
+        
+        Args:
+            text: Respuesta del modelo.
+            tag_name: Nombre de la etiqueta.
+            
+        Returns:
+            Diccionario {id: contenido}. Si un id aparece varias veces se conserva el primero.
+        """
+        tag = re.escape(tag_name)
+        opening = rf"\[\s*{tag}\s+id\s*=\s*[\"']?(\d+)[\"']?\s*\]"
+        closing = rf"\[\s*/\s*{tag}(?:\s+id\s*=\s*[\"']?\d+[\"']?)?\s*\]"
+        next_opening = rf"\[\s*{tag}\s+id\s*="
+        # Una sección sin cierre termina donde empieza la siguiente o al final
+        pattern = rf"{opening}(.*?)(?:{closing}|(?={next_opening})|\Z)"
+        sections = {}
+        for match in re.finditer(pattern, text, re.DOTALL | re.IGNORECASE):
+            section_id = int(match.group(1))
+            if section_id not in sections:
+                sections[section_id] = match.group(2).strip()
+        return sections
+    
     def process_audio(self, 
                      audio_file: Union[str, BinaryIO],
                      transcription_model: str = WHISPER_MODEL,
@@ -224,6 +276,36 @@ class GPTAudioProcessor:
             prompt=transcription_prompt
         )
         
+        return self.polish_text(
+            transcribed_text,
+            process_model=process_model,
+            system_message=system_message,
+            prompt_template=prompt_template,
+            tag_name=tag_name,
+            clean_response=clean_response
+        )
+    
+    def polish_text(self,
+                    transcribed_text: str,
+                    process_model: str = "gpt-3.5-turbo",
+                    system_message: str = "Eres un asistente útil.",
+                    prompt_template: str = "{text}",
+                    tag_name: str = "text_to_cursor",
+                    clean_response: bool = True) -> str:
+        """
+        Pule un texto ya transcrito con GPT (segunda etapa de `process_audio`).
+        
+        Args:
+            transcribed_text: Texto transcrito a pulir.
+            process_model: Modelo para procesamiento de texto.
+            system_message: Mensaje del sistema para definir el comportamiento del asistente.
+            prompt_template: Plantilla para formatear el texto transcrito. Use {text} donde debe ir el texto.
+            tag_name: Nombre de la etiqueta para envolver la respuesta.
+            clean_response: Si se debe extraer el texto entre etiquetas.
+            
+        Returns:
+            Texto procesado por el modelo.
+        """
         # Formatear el prompt según la plantilla
         formatted_prompt = prompt_template.format(text=transcribed_text)
         
@@ -241,6 +323,61 @@ class GPTAudioProcessor:
             processed_text = self._extract_tagged_content(processed_text, tag_name)
         
         return processed_text
+    
+    def polish_texts_batch(self,
+                           transcribed_texts: List[str],
+                           process_model: str = "gpt-3.5-turbo",
+                           system_message: str = "Eres un asistente útil.",
+                           prompt_template: str = "{text}",
+                           tag_name: str = "text_to_cursor") -> List[str]:
+        """
+        Pule varios textos transcritos con una sola llamada a GPT. Cada texto se
+        envía en una sección numerada ([tag_name id=N]) y la respuesta se separa
+        por id. Los textos cuya sección falte en la respuesta se pulen
+        individualmente con `polish_text`.
+        
+        Args:
+            transcribed_texts: Textos transcritos a pulir.
+            process_model: Modelo para procesamiento de texto.
+            system_message: Mensaje del sistema para definir el comportamiento del asistente.
+            prompt_template: Plantilla aplicada a cada texto. Use {text} donde debe ir el texto.
+            tag_name: Nombre de la etiqueta para las secciones.
+            
+        Returns:
+            Lista de textos pulidos, en el mismo orden que `transcribed_texts`.
+        """
+        if len(transcribed_texts) <= 1:
+            return [
+                self.polish_text(text, process_model, system_message, prompt_template, tag_name)
+                for text in transcribed_texts
+            ]
+        
+        # Instrucción para procesar cada sección por separado conservando su id
+        batch_instruction = (
+            f" Recibirás varios textos independientes, cada uno entre [{tag_name} id=N] y [/{tag_name}]."
+            f" Procesa cada uno por separado y devuelve cada resultado exactamente entre"
+            f" [{tag_name} id=N] y [/{tag_name}], con el mismo id. No añadas ningún texto fuera de estas etiquetas."
+        )
+        sections = [
+            f"[{tag_name} id={i}]\n{prompt_template.format(text=text)}\n[/{tag_name}]"
+            for i, text in enumerate(transcribed_texts, start=1)
+        ]
+        
+        response = self.process_text_with_gpt(
+            "\n\n".join(sections),
+            model=process_model,
+            system_message=system_message + batch_instruction,
+            tag_output=False
+        )
+        results = self._extract_numbered_sections(response, tag_name)
+        
+        polished = []
+        for i, text in enumerate(transcribed_texts, start=1):
+            if i in results:
+                polished.append(results[i])
+            else:
+                polished.append(self.polish_text(text, process_model, system_message, prompt_template, tag_name))
+        return polished
         
     @classmethod
     def get_available_transcription_models(cls) -> List[str]:
@@ -250,4 +387,13 @@ class GPTAudioProcessor:
         Returns:
             Lista de modelos de transcripción soportados.
         """
-        return [cls.WHISPER_MODEL, cls.GPT4O_MINI_TRANSCRIBE] 
\ No newline at end of file
+        return [cls.WHISPER_MODEL, cls.GPT4O_MINI_TRANSCRIBE]
+    
+    def get_backend_transcription_models(self) -> List[str]:
+        """
+        Devuelve los modelos soportados por el backend de transcripción activo.
+        
+        Returns:
+            Lista de modelos del backend actual.
+        """
+        return self.transcription_backend.available_models() 
\ No newline at end of file
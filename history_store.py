@@ -0,0 +1,275 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+from user_data import get_user_data_dir
+
+# Base de datos donde se guarda el historial de dictados (fuera del código fuente)
+HISTORY_FILE = os.path.join(get_user_data_dir(), "dictation_history.db")
+
+# Columnas de cada entrada, en el orden en que se devuelven
+HISTORY_COLUMNS = [
+    "id",
+    "created_at",
+    "transcript",
+    "polished",
+    "backend",
+    "transcription_model",
+    "process_model",
+    "audio_seconds",
+    "transcription_seconds",
+    "polish_seconds",
+    "total_seconds",
+]
+
+
+def _build_fts_query(query: str) -> str:
+    # Cada palabra se busca como prefijo y entre comillas, para que la
+    # sintaxis de FTS5 (AND, NOT, *, comillas...) no provoque errores
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class HistoryStore:
+    """
+    Historial de dictados en SQLite de solo inserción. Cada entrada guarda la
+    transcripción, el texto pulido, los modelos usados y el tiempo de cada
+    etapa. Si SQLite incluye FTS5, las búsquedas usan un índice de texto
+    completo; si no, se recurre a LIKE.
+
+    La retención está acotada: al superar `max_entries` (o `max_age_days`) se
+    eliminan las entradas más antiguas, y `compact()` reconstruye el índice y
+    libera el espacio del archivo.
+    """
+
+    def __init__(self,
+                 path: str = HISTORY_FILE,
+                 max_entries: int = 5000,
+                 max_age_days: Optional[float] = None,
+                 compact_every: int = 500):
+        """
+        Abre (o crea) el historial.
+
+        Args:
+            path: Ruta al archivo SQLite (":memory:" para un historial temporal).
+            max_entries: Número máximo de entradas que se conservan.
+            max_age_days: Antigüedad máxima de las entradas en días (None = sin límite).
+            compact_every: Entradas eliminadas por retención tras las que se compacta el archivo.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.compact_every = compact_every
+        self._deleted_since_compact = 0
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # La conexión se comparte entre hilos (el procesamiento ocurre fuera de la interfaz)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self.has_fts = self._create_schema()
+
+    def _create_schema(self) -> bool:
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    transcript TEXT NOT NULL,
+                    polished TEXT NOT NULL,
+                    backend TEXT,
+                    transcription_model TEXT,
+                    process_model TEXT,
+                    audio_seconds REAL,
+                    transcription_seconds REAL,
+                    polish_seconds REAL,
+                    total_seconds REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_created_at ON entries(created_at)")
+
+        try:
+            with self._conn:
+                # Índice externo: el texto solo se guarda una vez, en `entries`
+                self._conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                        transcript, polished, content='entries', content_rowid='id'
+                    )
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                        INSERT INTO entries_fts(rowid, transcript, polished)
+                        VALUES (new.id, new.transcript, new.polished);
+                    END
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                        INSERT INTO entries_fts(entries_fts, rowid, transcript, polished)
+                        VALUES ('delete', old.id, old.transcript, old.polished);
+                    END
+                """)
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 no disponible, la búsqueda usará LIKE: {e}")
+            return False
+
+    def add(self,
+            transcript: str,
+            polished: str,
+            backend: Optional[str] = None,
+            transcription_model: Optional[str] = None,
+            process_model: Optional[str] = None,
+            audio_seconds: Optional[float] = None,
+            transcription_seconds: Optional[float] = None,
+            polish_seconds: Optional[float] = None,
+            total_seconds: Optional[float] = None) -> int:
+        """
+        Añade un dictado al historial y aplica la retención.
+
+        Args:
+            transcript: Transcripción original.
+            polished: Texto pulido.
+            backend: Motor de transcripción usado.
+            transcription_model: Modelo de transcripción usado.
+            process_model: Modelo GPT usado para pulir.
+            audio_seconds: Duración del audio.
+            transcription_seconds: Tiempo de la etapa de transcripción.
+            polish_seconds: Tiempo de la etapa de pulido.
+            total_seconds: Tiempo total del procesamiento.
+
+        Returns:
+            Identificador de la nueva entrada.
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO entries (created_at, transcript, polished, backend, transcription_model,"
+                    " process_model, audio_seconds, transcription_seconds, polish_seconds, total_seconds)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), transcript, polished, backend, transcription_model, process_model,
+                     audio_seconds, transcription_seconds, polish_seconds, total_seconds)
+                )
+                entry_id = cursor.lastrowid
+                deleted = self._apply_retention()
+
+            self._deleted_since_compact += deleted
+            if self.compact_every and self._deleted_since_compact >= self.compact_every:
+                self._compact()
+        return entry_id
+
+    def _apply_retention(self) -> int:
+        deleted = 0
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            deleted += self._conn.execute("DELETE FROM entries WHERE created_at < ?", (cutoff,)).rowcount
+        if self.max_entries:
+            deleted += self._conn.execute(
+                "DELETE FROM entries WHERE id NOT IN (SELECT id FROM entries ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,)
+            ).rowcount
+        return deleted
+
+    def _compact(self):
+        if self.has_fts:
+            with self._conn:
+                self._conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('optimize')")
+        # VACUUM no puede ejecutarse dentro de una transacción
+        self._conn.execute("VACUUM")
+        self._deleted_since_compact = 0
+
+    def compact(self):
+        """Aplica la retención, optimiza el índice y libera el espacio de las entradas eliminadas."""
+        with self._lock:
+            with self._conn:
+                self._apply_retention()
+            self._compact()
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Devuelve las entradas más recientes.
+
+        Args:
+            limit: Número máximo de entradas.
+
+        Returns:
+            Lista de entradas, de la más reciente a la más antigua.
+        """
+        columns = ", ".join(HISTORY_COLUMNS)
+        return self._rows(f"SELECT {columns} FROM entries ORDER BY id DESC LIMIT ?", (limit,))
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Busca dictados por texto en la transcripción o en el texto pulido.
+
+        Args:
+            query: Palabras a buscar (coincidencia por prefijo). Vacío devuelve las más recientes.
+            limit: Número máximo de resultados.
+
+        Returns:
+            Lista de entradas, de la más reciente a la más antigua.
+        """
+        if not query or not query.strip():
+            return self.recent(limit)
+
+        if self.has_fts:
+            fts_query = _build_fts_query(query)
+            if not fts_query:
+                return self.recent(limit)
+            columns = ", ".join(f"e.{column}" for column in HISTORY_COLUMNS)
+            return self._rows(
+                f"SELECT {columns} FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+                " WHERE entries_fts MATCH ? ORDER BY e.id DESC LIMIT ?",
+                (fts_query, limit)
+            )
+
+        columns = ", ".join(HISTORY_COLUMNS)
+        conditions = []
+        params = []
+        for word in query.split():
+            conditions.append("(transcript LIKE ? OR polished LIKE ?)")
+            params.extend([f"%{word}%", f"%{word}%"])
+        return self._rows(
+            f"SELECT {columns} FROM entries WHERE {' AND '.join(conditions)} ORDER BY id DESC LIMIT ?",
+            tuple(params) + (limit,)
+        )
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una entrada por su identificador.
+
+        Args:
+            entry_id: Identificador de la entrada.
+
+        Returns:
+            La entrada, o None si no existe (o fue eliminada por la retención).
+        """
+        columns = ", ".join(HISTORY_COLUMNS)
+        rows = self._rows(f"SELECT {columns} FROM entries WHERE id = ?", (entry_id,))
+        return rows[0] if rows else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = HistoryStore()
+    for entry in store.search(" ".join(sys.argv[1:]), limit=20):
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+        print(f"[{entry['id']}] {created} ({entry['process_model']}): {entry['polished']}")
+    store.close()
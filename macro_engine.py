@@ -0,0 +1,266 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable
+
+from user_data import get_user_data_dir
+
+# Archivo donde se guardan las secuencias definidas por el usuario
+MACROS_FILE = os.path.join(get_user_data_dir(), "macros.json")
+# Ubicación anterior (junto al código); se sigue leyendo si no existe la nueva
+LEGACY_MACROS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "macros.json")
+
+# Variables de la forma {nombre} dentro de los pasos
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+# Secuencia por defecto: Enter -> Clic -> Pegar -> Enter. Las esperas fijas se
+# sustituyen por condiciones (ventana destino enfocada, portapapeles listo)
+# con un tiempo máximo corto.
+DEFAULT_MACRO_NAME = "Pegar y enviar"
+DEFAULT_MACRO = [
+    {"action": "enter"},
+    {"action": "click", "x": "{x}", "y": "{y}"},
+    {"action": "wait_focus", "x": "{x}", "y": "{y}", "timeout": 0.5},
+    {"action": "wait_clipboard", "timeout": 0.5},
+    {"action": "paste"},
+    {"action": "sleep", "seconds": 0.05},
+    {"action": "enter"},
+]
+
+
+class MacroError(Exception):
+    """Error al validar o ejecutar una secuencia."""
+
+
+def load_macros(path: str = MACROS_FILE) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Carga las secuencias guardadas por el usuario.
+
+    Args:
+        path: Ruta al archivo JSON de secuencias.
+
+    Returns:
+        Diccionario {nombre: pasos}. Siempre incluye la secuencia por defecto.
+    """
+    macros = {DEFAULT_MACRO_NAME: list(DEFAULT_MACRO)}
+    if path == MACROS_FILE and not os.path.exists(path) and os.path.exists(LEGACY_MACROS_FILE):
+        path = LEGACY_MACROS_FILE
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            macros.update(json.load(f))
+    return macros
+
+
+def save_macros(macros: Dict[str, List[Dict[str, Any]]], path: str = MACROS_FILE):
+    """
+    Guarda las secuencias del usuario (la secuencia por defecto no se guarda).
+
+    Args:
+        macros: Diccionario {nombre: pasos}.
+        path: Ruta al archivo JSON de secuencias.
+    """
+    for steps in macros.values():
+        MacroEngine.validate(steps)
+    user_macros = {name: steps for name, steps in macros.items() if name != DEFAULT_MACRO_NAME}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(user_macros, f, ensure_ascii=False, indent=2)
+
+
+class MacroEngine:
+    """
+    Ejecuta secuencias declarativas de acciones sobre PcController.
+
+    Cada paso es un diccionario con una clave "action" y sus parámetros.
+    Los valores de texto pueden usar variables con la sintaxis "{nombre}"
+    (por ejemplo "{x}", "{y}" o "{text}").
+
+    Acciones disponibles:
+        enter, paste, copy                          Teclas básicas.
+        click, double_click, right_click, move      Requieren "x" e "y".
+        key                                         Requiere "key".
+        hotkey                                      Requiere "keys" (lista).
+        type                                        Requiere "text".
+        sleep                                       Requiere "seconds".
+        wait_focus      Espera a que la ventana en ("x", "y") esté activa.
+        wait_clipboard  Espera a que el portapapeles contenga "text" (o la variable text).
+    """
+
+    ACTIONS = {
+        "enter": [], "paste": [], "copy": [],
+        "click": ["x", "y"], "double_click": ["x", "y"], "right_click": ["x", "y"], "move": ["x", "y"],
+        "key": ["key"], "hotkey": ["keys"], "type": ["text"], "sleep": ["seconds"],
+        "wait_focus": ["x", "y"], "wait_clipboard": [],
+    }
+
+    def __init__(self,
+                 pc_ctrl,
+                 clipboard_get: Optional[Callable[[], str]] = None,
+                 poll_interval: float = 0.01):
+        """
+        Inicializa el motor de secuencias.
+
+        Args:
+            pc_ctrl: Instancia de PcController.
+            clipboard_get: Función que devuelve el contenido del portapapeles (por defecto pyperclip.paste).
+            poll_interval: Intervalo en segundos entre comprobaciones de las esperas por condición.
+        """
+        self.pc_ctrl = pc_ctrl
+        if clipboard_get is None:
+            import pyperclip
+            clipboard_get = pyperclip.paste
+        self.clipboard_get = clipboard_get
+        self.poll_interval = poll_interval
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @classmethod
+    def validate(cls, steps: List[Dict[str, Any]]):
+        """
+        Comprueba que una secuencia sea válida.
+
+        Args:
+            steps: Lista de pasos.
+
+        Raises:
+            MacroError: Si algún paso tiene una acción desconocida o le faltan parámetros.
+        """
+        for i, step in enumerate(steps):
+            action = step.get("action")
+            if action not in cls.ACTIONS:
+                raise MacroError(f"Paso {i + 1}: acción desconocida '{action}'")
+            missing = [param for param in cls.ACTIONS[action] if param not in step]
+            if missing:
+                raise MacroError(f"Paso {i + 1} ({action}): faltan parámetros {', '.join(missing)}")
+
+    def wait_until(self, condition: Callable[[], bool], timeout: float) -> bool:
+        """
+        Espera hasta que se cumpla una condición o venza el tiempo máximo.
+
+        Args:
+            condition: Función sin argumentos que devuelve True cuando se cumple la condición.
+            timeout: Tiempo máximo de espera en segundos.
+
+        Returns:
+            True si se cumplió la condición, False si venció el tiempo.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            if condition():
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def _resolve(self, value, variables: Dict[str, Any]):
+        # Solo se sustituyen las variables conocidas; el resto de llaves se deja
+        # tal cual (sin str.format, que fallaría con "{}" y permitiría "{x.attr}")
+        if isinstance(value, str) and "{" in value:
+            value = PLACEHOLDER_PATTERN.sub(
+                lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0),
+                value
+            )
+        return value
+
+    def _coords(self, step: Dict[str, Any], variables: Dict[str, Any]):
+        return int(self._resolve(step["x"], variables)), int(self._resolve(step["y"], variables))
+
+    def _run_step(self, step: Dict[str, Any], variables: Dict[str, Any]):
+        action = step["action"]
+        pc = self.pc_ctrl
+
+        if action == "enter":
+            pc.enter()
+        elif action == "paste":
+            pc.pegar()
+        elif action == "copy":
+            pc.copiar()
+        elif action == "click":
+            pc.click_izquierdo(*self._coords(step, variables))
+        elif action == "double_click":
+            pc.doble_click(*self._coords(step, variables))
+        elif action == "right_click":
+            pc.click_derecho(*self._coords(step, variables))
+        elif action == "move":
+            pc.mover_cursor(*self._coords(step, variables))
+        elif action == "key":
+            pc.tecla_presionada(self._resolve(step["key"], variables))
+        elif action == "hotkey":
+            pc.combinacion_teclas(*[self._resolve(k, variables) for k in step["keys"]])
+        elif action == "type":
+            pc.escribir(self._resolve(step["text"], variables))
+        elif action == "sleep":
+            time.sleep(float(step["seconds"]))
+        elif action == "wait_focus":
+            x, y = self._coords(step, variables)
+            target = pc.ventana_en(x, y)
+            # Si el sistema no permite consultar ventanas no hay nada que esperar
+            if target is not None:
+                self.wait_until(lambda: pc.ventana_activa() == target, float(step.get("timeout", 0.5)))
+        elif action == "wait_clipboard":
+            if "text" in step:
+                expected = self._resolve(step["text"], variables)
+            else:
+                expected = variables.get("text")
+            if expected is None:
+                condition = lambda: bool(self.clipboard_get())
+            else:
+                condition = lambda: self.clipboard_get() == expected
+            if not self.wait_until(condition, float(step.get("timeout", 0.5))):
+                raise MacroError("El portapapeles no contiene el texto esperado")
+
+    def run(self, steps: List[Dict[str, Any]], variables: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Ejecuta una secuencia en el hilo actual.
+
+        Args:
+            steps: Lista de pasos.
+            variables: Valores para las variables "{nombre}" de los pasos.
+
+        Returns:
+            Tiempo total de ejecución en segundos.
+        """
+        self.validate(steps)
+        variables = variables or {}
+        start = time.perf_counter()
+        for step in steps:
+            self._run_step(step, variables)
+        return time.perf_counter() - start
+
+    def run_async(self,
+                  steps: List[Dict[str, Any]],
+                  variables: Optional[Dict[str, Any]] = None,
+                  on_done: Optional[Callable[[Optional[float], Optional[Exception]], None]] = None) -> bool:
+        """
+        Ejecuta una secuencia en un hilo en segundo plano.
+
+        Args:
+            steps: Lista de pasos.
+            variables: Valores para las variables "{nombre}" de los pasos.
+            on_done: Función llamada desde el hilo de trabajo con (duración, error) al terminar.
+
+        Returns:
+            False si ya había una secuencia en ejecución, True si se inició.
+        """
+        if self.running:
+            return False
+
+        def worker():
+            try:
+                elapsed = self.run(steps, variables)
+            except Exception as e:
+                if on_done:
+                    on_done(None, e)
+                return
+            if on_done:
+                on_done(elapsed, None)
+
+        self._thread = threading.Thread(target=worker, daemon=True)
+        self._thread.start()
+        return True
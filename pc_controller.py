@@ -2,10 +2,10 @@ import pyautogui
 import time
 
 class PcController:
-    def __init__(self):
+    def __init__(self, pausa=0.1):
         # Configurar PyAutoGUI para mayor seguridad
         pyautogui.FAILSAFE = True  # Mover el ratón a la esquina superior izquierda detendrá el script
-        pyautogui.PAUSE = 0.1  # Pequeño retraso entre acciones
+        pyautogui.PAUSE = pausa  # Pequeño retraso entre acciones
 
     def click_derecho(self, x, y):
         """Realiza un clic derecho en las coordenadas especificadas"""
@@ -52,4 +52,20 @@ class PcController:
         
     def combinacion_teclas(self, *teclas):
         """Presiona una combinación de teclas simultáneamente"""
-        pyautogui.hotkey(*teclas) 
\ No newline at end of file
+        pyautogui.hotkey(*teclas)
+        
+    def ventana_activa(self):
+        """Devuelve el título de la ventana activa, o None si no se puede consultar"""
+        try:
+            ventana = pyautogui.getActiveWindow()
+        except Exception:
+            return None
+        return ventana.title if ventana is not None else None
+        
+    def ventana_en(self, x, y):
+        """Devuelve el título de la ventana en las coordenadas indicadas, o None si no se puede consultar"""
+        try:
+            ventanas = pyautogui.getWindowsAt(x, y)
+        except Exception:
+            return None
+        return ventanas[0].title if ventanas else None
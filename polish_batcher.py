@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from gpt_audio_processor import GPTAudioProcessor
+
+
+class PolishBatcher:
+    """
+    Agrupa los textos pendientes de pulir que llegan dentro de una ventana de
+    tiempo corta y los envía en una sola petición de chat
+    (`GPTAudioProcessor.polish_texts_batch`). Así, bajo carga, el mensaje del
+    sistema se envía una vez por lote y no una vez por texto.
+    """
+
+    def __init__(self,
+                 processor: GPTAudioProcessor,
+                 process_model: str = "gpt-3.5-turbo",
+                 system_message: str = "Eres un asistente útil.",
+                 prompt_template: str = "{text}",
+                 tag_name: str = "text_to_cursor",
+                 window_ms: int = 50,
+                 max_batch: int = 8,
+                 max_concurrent_requests: int = 4):
+        """
+        Inicializa el agrupador y arranca su hilo de recogida.
+
+        Args:
+            processor: Procesador usado para las llamadas a GPT.
+            process_model: Modelo para procesamiento de texto.
+            system_message: Mensaje del sistema para definir el comportamiento del asistente.
+            prompt_template: Plantilla aplicada a cada texto. Use {text} donde debe ir el texto.
+            tag_name: Nombre de la etiqueta para las secciones.
+            window_ms: Tiempo máximo de espera desde el primer texto pendiente antes de enviar el lote.
+            max_batch: Número máximo de textos por petición.
+            max_concurrent_requests: Peticiones de chat simultáneas.
+        """
+        self.processor = processor
+        self.process_model = process_model
+        self.system_message = system_message
+        self.prompt_template = prompt_template
+        self.tag_name = tag_name
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        self.stats = {"items": 0, "requests": 0, "batched_items": 0}
+
+        self._pending: List[Tuple[str, Future]] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_requests),
+                                            thread_name_prefix="polish-batch")
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def submit(self, transcribed_text: str) -> Future:
+        """
+        Encola un texto para pulirlo.
+
+        Args:
+            transcribed_text: Texto transcrito.
+
+        Returns:
+            Future que se resuelve con el texto pulido.
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("El agrupador está cerrado")
+            self._pending.append((transcribed_text, future))
+            self._condition.notify()
+        return future
+
+    def polish(self, transcribed_text: str) -> str:
+        """
+        Pule un texto esperando a su lote (versión bloqueante de `submit`).
+        """
+        return self.submit(transcribed_text).result()
+
+    def _collect(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+
+                # Esperar a que se llene el lote o venza la ventana desde el primer texto
+                deadline = time.monotonic() + self.window_ms / 1000.0
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Future]]):
+        texts = [text for text, _future in batch]
+        with self._condition:
+            self.stats["items"] += len(batch)
+            self.stats["requests"] += 1
+            if len(batch) > 1:
+                self.stats["batched_items"] += len(batch)
+
+        try:
+            results = self.processor.polish_texts_batch(
+                texts,
+                process_model=self.process_model,
+                system_message=self.system_message,
+                prompt_template=self.prompt_template,
+                tag_name=self.tag_name
+            )
+        except Exception as e:
+            for _text, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_text, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Devuelve estadísticas de agrupación.
+
+        Returns:
+            Diccionario con textos, peticiones y tamaño medio de lote.
+        """
+        with self._condition:
+            stats = dict(self.stats)
+        stats["avg_batch_size"] = round(stats["items"] / stats["requests"], 2) if stats["requests"] else 0.0
+        return stats
+
+    def close(self):
+        """Envía los textos pendientes y detiene el agrupador."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
@@ -1,6 +1,17 @@
+import hashlib
 import os
 import re
-from typing import List, Dict, Tuple
+import sys
+import threading
+from typing import List, Dict, Tuple, Optional, Callable
+
+# Función de progreso: recibe (archivos escaneados, funciones encontradas)
+ProgressCallback = Callable[[int, int], None]
+
+
+class ScanCancelled(Exception):
+    """La exploración del proyecto fue cancelada."""
+
 
 class ProjectExplorer:
     """
@@ -33,7 +44,11 @@ class ProjectExplorer:
         # Carpetas a omitir durante la exploración
         self.ignored_folders = ['__pycache__', '.git', '.vscode', 'node_modules', 'venv', 'env', '.env']
     
-    def _get_file_tree(self, start_path: str, prefix: str = "", is_root: bool = True) -> List[str]:
+    def _get_file_tree(self,
+                       start_path: str,
+                       prefix: str = "",
+                       is_root: bool = True,
+                       listing: Optional[Dict[str, Tuple[List[str], List[str]]]] = None) -> List[str]:
         """
         Genera una representación en árbol de los archivos y carpetas.
         
@@ -41,6 +56,8 @@ class ProjectExplorer:
             start_path: Ruta inicial para el árbol.
             prefix: Prefijo para la indentación.
             is_root: Si es la carpeta raíz.
+            listing: Contenido ya leído de cada carpeta {ruta: (carpetas, archivos)};
+                     si se indica, no se vuelve a leer el disco.
             
         Returns:
             Lista de cadenas que representan el árbol de archivos.
@@ -51,23 +68,26 @@ class ProjectExplorer:
         else:
             tree_lines = []
         
-        # Obtener elementos del directorio y ordenarlos
-        items = os.listdir(start_path)
-        folders = []
-        files = []
-        
-        # Filtrar carpetas y archivos, omitiendo las carpetas ignoradas
-        for item in items:
-            item_path = os.path.join(start_path, item)
-            if os.path.isdir(item_path):
-                # Solo incluir la carpeta si no está en la lista de ignorados
-                if item not in self.ignored_folders:
-                    folders.append(item)
-            else:
-                files.append(item)
+        if listing is not None:
+            folders, files = listing.get(start_path, ([], []))
+        else:
+            # Obtener elementos del directorio
+            items = os.listdir(start_path)
+            folders = []
+            files = []
+            
+            # Filtrar carpetas y archivos, omitiendo las carpetas ignoradas
+            for item in items:
+                item_path = os.path.join(start_path, item)
+                if os.path.isdir(item_path):
+                    # Solo incluir la carpeta si no está en la lista de ignorados
+                    if item not in self.ignored_folders:
+                        folders.append(item)
+                else:
+                    files.append(item)
         
-        folders.sort()
-        files.sort()
+        folders = sorted(folders)
+        files = sorted(files)
         
         # Primero las carpetas
         for i, folder in enumerate(folders):
@@ -79,7 +99,8 @@ class ProjectExplorer:
             subtree = self._get_file_tree(
                 subpath, 
                 prefix + ("    " if is_last else "│   "), 
-                is_root=False
+                is_root=False,
+                listing=listing
             )
             tree_lines.extend(subtree)
         
@@ -125,53 +146,127 @@ class ProjectExplorer:
         
         return functions
     
-    def scan_project(self) -> Tuple[List[str], List[str]]:
+    def _walk(self,
+              progress_callback: Optional[ProgressCallback] = None,
+              cancel_event: Optional[threading.Event] = None,
+              progress_every: int = 50,
+              extract_functions: bool = True) -> Tuple[Dict[str, Tuple[List[str], List[str]]], List[str], str]:
         """
-        Escanea el proyecto para obtener la estructura de archivos y nombres de funciones.
+        Recorre el proyecto una sola vez y obtiene a la vez el contenido de cada
+        carpeta, los nombres de funciones y la huella del árbol.
+        
+        Args:
+            progress_callback: Función llamada con (archivos escaneados, funciones encontradas).
+            cancel_event: Evento que, al activarse, cancela la exploración.
+            progress_every: Cada cuántos archivos se informa del progreso.
+            extract_functions: Si se deben leer los archivos de código para extraer funciones.
         
         Returns:
-            Tupla con (lista de líneas de árbol, lista de nombres de funciones).
+            Tupla con ({carpeta: (subcarpetas, archivos)}, funciones ordenadas, huella).
+            
+        Raises:
+            ScanCancelled: Si se activa `cancel_event` durante la exploración.
         """
-        # Verificar que la ruta existe
-        if not os.path.exists(self.project_path):
-            return [], []
-        
-        # Generar árbol de archivos
-        file_tree = self._get_file_tree(self.project_path)
+        listing = {}
+        all_functions = set()
+        digest = hashlib.sha1()
+        files_scanned = 0
         
-        # Extraer nombres de funciones
-        all_functions = []
-        
-        # Recorrer todos los archivos recursivamente
         for root, dirs, files in os.walk(self.project_path):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ScanCancelled()
+            
             # Modificar dirs en su lugar para evitar recorrer carpetas ignoradas
             # Esto afecta a os.walk para que no entre en esas carpetas
-            dirs[:] = [d for d in dirs if d not in self.ignored_folders]
+            dirs[:] = sorted(d for d in dirs if d not in self.ignored_folders)
+            files = sorted(files)
+            listing[root] = (list(dirs), files)
+            rel_root = os.path.relpath(root, self.project_path)
             
             for file in files:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ScanCancelled()
+                
                 file_path = os.path.join(root, file)
-                _, ext = os.path.splitext(file)
+                try:
+                    stat = os.stat(file_path)
+                    digest.update(f"{rel_root}/{file}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8', 'surrogateescape'))
+                except OSError:
+                    pass
                 
                 # Si es un archivo de código, extraer funciones
-                if ext in self.code_extensions:
-                    functions = self._extract_functions_from_file(file_path)
-                    all_functions.extend(functions)
+                _, ext = os.path.splitext(file)
+                if extract_functions and ext in self.code_extensions:
+                    all_functions.update(self._extract_functions_from_file(file_path))
+                
+                files_scanned += 1
+                if progress_callback and files_scanned % progress_every == 0:
+                    progress_callback(files_scanned, len(all_functions))
         
-        # Eliminar duplicados y ordenar
-        all_functions = sorted(list(set(all_functions)))
+        if progress_callback:
+            progress_callback(files_scanned, len(all_functions))
         
-        return file_tree, all_functions
+        # Ordenar los nombres (sin duplicados)
+        return listing, sorted(all_functions), digest.hexdigest()
     
-    def generate_transcription_prompt(self) -> str:
+    def fingerprint(self,
+                    progress_callback: Optional[Callable[[int], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> str:
         """
-        Genera un prompt para mejorar la transcripción basado en los nombres
-        de archivos y funciones encontradas en el proyecto.
+        Calcula una huella barata del árbol del proyecto a partir de los nombres,
+        tamaños y fechas de modificación de los archivos (sin leer su contenido).
+        
+        Args:
+            progress_callback: Función llamada con el número de archivos recorridos
+                               (este recorrido no cuenta funciones).
+            cancel_event: Evento que, al activarse, cancela el recorrido.
         
         Returns:
-            Prompt para mejorar la transcripción.
+            Huella hexadecimal; cambia si se añade, elimina o modifica algún archivo.
+            
+        Raises:
+            ScanCancelled: Si se activa `cancel_event` durante el recorrido.
+        """
+        if not os.path.exists(self.project_path):
+            return hashlib.sha1().hexdigest()
+        walk_progress = None
+        if progress_callback:
+            walk_progress = lambda files, _functions: progress_callback(files)
+        return self._walk(walk_progress, cancel_event, extract_functions=False)[2]
+    
+    def _scan(self,
+              progress_callback: Optional[ProgressCallback] = None,
+              cancel_event: Optional[threading.Event] = None,
+              progress_every: int = 50) -> Tuple[List[str], List[str], str]:
+        # Árbol, funciones y huella en un único recorrido del disco
+        if not os.path.exists(self.project_path):
+            return [], [], hashlib.sha1().hexdigest()
+        listing, functions, fingerprint = self._walk(progress_callback, cancel_event, progress_every)
+        file_tree = self._get_file_tree(self.project_path, listing=listing)
+        return file_tree, functions, fingerprint
+    
+    def scan_project(self,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     progress_every: int = 50) -> Tuple[List[str], List[str]]:
         """
-        file_tree, functions = self.scan_project()
+        Escanea el proyecto para obtener la estructura de archivos y nombres de funciones.
+        
+        Args:
+            progress_callback: Función llamada con (archivos escaneados, funciones encontradas).
+            cancel_event: Evento que, al activarse, cancela la exploración.
+            progress_every: Cada cuántos archivos se informa del progreso.
         
+        Returns:
+            Tupla con (lista de líneas de árbol, lista de nombres de funciones).
+            
+        Raises:
+            ScanCancelled: Si se activa `cancel_event` durante la exploración.
+        """
+        file_tree, functions, _ = self._scan(progress_callback, cancel_event, progress_every)
+        return file_tree, functions
+    
+    def _build_prompt(self, file_tree: List[str], functions: List[str]) -> str:
         prompt_parts = []
         prompt_parts.append("El usuario puede mencionar los siguientes nombres de archivos en el audio:")
         
@@ -192,25 +287,77 @@ class ProjectExplorer:
         
         # Construir prompt final
         return "\n".join(prompt_parts)
+    
+    def generate_transcription_prompt(self,
+                                      progress_callback: Optional[ProgressCallback] = None,
+                                      cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        Genera un prompt para mejorar la transcripción basado en los nombres
+        de archivos y funciones encontradas en el proyecto.
+        
+        Args:
+            progress_callback: Función llamada con (archivos escaneados, funciones encontradas).
+            cancel_event: Evento que, al activarse, cancela la exploración.
+        
+        Returns:
+            Prompt para mejorar la transcripción.
+        """
+        file_tree, functions = self.scan_project(progress_callback, cancel_event)
+        return self._build_prompt(file_tree, functions)
+
+# Prompts ya generados por ruta: {ruta: (huella del árbol, prompt, número de funciones)}
+_prompt_cache: Dict[str, Tuple[str, str, int]] = {}
+_prompt_cache_lock = threading.Lock()
 
 # Función para obtener el prompt directamente
-def get_project_transcription_prompt(project_path: str) -> str:
+def get_project_transcription_prompt(project_path: str,
+                                     use_cache: bool = True,
+                                     progress_callback: Optional[ProgressCallback] = None,
+                                     cancel_event: Optional[threading.Event] = None) -> str:
     """
     Obtiene un prompt para mejorar la transcripción basado en 
     los archivos y funciones de un proyecto.
     
+    El resultado se memoriza por ruta y solo se regenera si cambia la huella
+    del árbol de archivos (ver `ProjectExplorer.fingerprint`). La primera
+    exploración de una ruta calcula la huella en el mismo recorrido.
+    
     Args:
         project_path: Ruta al directorio del proyecto.
+        use_cache: Si se puede reutilizar un prompt memorizado.
+        progress_callback: Función llamada con (archivos escaneados, funciones encontradas).
+        cancel_event: Evento que, al activarse, cancela la exploración.
         
     Returns:
         Prompt para mejorar la transcripción.
+        
+    Raises:
+        ScanCancelled: Si se activa `cancel_event` durante la exploración.
     """
     explorer = ProjectExplorer(project_path)
-    return explorer.generate_transcription_prompt()
+    key = os.path.abspath(project_path)
+    
+    if use_cache:
+        with _prompt_cache_lock:
+            cached = _prompt_cache.get(key)
+        # Solo hace falta recorrer el árbol por separado si hay algo que validar
+        if cached:
+            # Mientras se valida, informar de las funciones del prompt memorizado
+            fingerprint_progress = None
+            if progress_callback:
+                fingerprint_progress = lambda files: progress_callback(files, cached[2])
+            if cached[0] == explorer.fingerprint(fingerprint_progress, cancel_event):
+                return cached[1]
+    
+    file_tree, functions, fingerprint = explorer._scan(progress_callback, cancel_event)
+    prompt = explorer._build_prompt(file_tree, functions)
+    with _prompt_cache_lock:
+        _prompt_cache[key] = (fingerprint, prompt, len(functions))
+    return prompt
 
 # Ejemplo de uso
 if __name__ == "__main__":
-    # Para pruebas
-    project_path = r"D:\CursorDeployments\Voice to cursor"
+    # Para pruebas: python project_explorer.py [ruta del proyecto]
+    project_path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
     prompt = get_project_transcription_prompt(project_path)
-    print(prompt) 
\ No newline at end of file
+    print(prompt)
@@ -0,0 +1,233 @@
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+
+from gpt_audio_processor import GPTAudioProcessor
+
+
+def _normalize_words(text: str) -> List[str]:
+    # Palabras en minúsculas y sin puntuación, para comparar transcripciones
+    return [w for w in (re.sub(r"[^\w]", "", word.lower()) for word in text.split()) if w]
+
+
+class SpeculativePolisher:
+    """
+    Pulido especulativo: mientras se transcribe el audio final, empieza a
+    pulir la transcripción parcial disponible. Cuando llega el texto final:
+
+    - si coincide con el parcial, se acepta el resultado especulativo;
+    - si solo difieren las últimas palabras, se corrige el resultado con una
+      llamada incremental pequeña;
+    - en otro caso se descarta la especulación y se pule el texto final.
+    """
+
+    def __init__(self,
+                 processor: GPTAudioProcessor,
+                 process_model: str = "gpt-3.5-turbo",
+                 system_message: str = "Eres un asistente útil.",
+                 prompt_template: str = "{text}",
+                 tag_name: str = "text_to_cursor",
+                 patch_model: Optional[str] = None,
+                 max_revised_words: int = 3,
+                 max_new_words: int = 25):
+        """
+        Inicializa el pulido especulativo.
+
+        Args:
+            processor: Procesador usado para transcribir y pulir.
+            process_model: Modelo para el pulido.
+            system_message: Mensaje del sistema para definir el comportamiento del asistente.
+            prompt_template: Plantilla para formatear el texto transcrito. Use {text} donde debe ir el texto.
+            tag_name: Nombre de la etiqueta para envolver la respuesta.
+            patch_model: Modelo para la corrección incremental (por defecto `process_model`).
+            max_revised_words: Palabras finales del parcial que pueden cambiar para corregir en lugar de repetir.
+            max_new_words: Palabras nuevas al final que se aceptan para corregir en lugar de repetir.
+        """
+        self.processor = processor
+        self.process_model = process_model
+        self.system_message = system_message
+        self.prompt_template = prompt_template
+        self.tag_name = tag_name
+        self.patch_model = patch_model or process_model
+        self.max_revised_words = max_revised_words
+        self.max_new_words = max_new_words
+
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative-polish")
+        self._lock = threading.Lock()
+        self._partial_text: Optional[str] = None
+        self._future: Optional[Future] = None
+        # Cada grabación tiene su generación; los parciales de una anterior se ignoran
+        self._generation = 0
+        self.metrics = {
+            "speculations": 0,
+            "resolved": 0,
+            "hits": 0,
+            "patched": 0,
+            "misses": 0,
+            "without_speculation": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def _polish(self, text: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        polished = self.processor.polish_text(
+            text,
+            process_model=self.process_model,
+            system_message=self.system_message,
+            prompt_template=self.prompt_template,
+            tag_name=self.tag_name,
+            clean_response=True
+        )
+        end = time.perf_counter()
+        return {"text": polished, "duration": end - start, "finished_at": end}
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def start(self, partial_text: str, generation: Optional[int] = None):
+        """
+        Inicia (o reemplaza) la especulación con la transcripción parcial más reciente.
+
+        Args:
+            partial_text: Transcripción del audio grabado hasta el momento.
+            generation: Generación de la grabación a la que pertenece el parcial
+                        (devuelta por `reset`); si ya no es la actual, se ignora.
+        """
+        if not partial_text or not partial_text.strip():
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._partial_text is not None and \
+                    _normalize_words(self._partial_text) == _normalize_words(partial_text):
+                return
+            if self._future is not None:
+                # Si ya se está ejecutando no se puede interrumpir; su resultado se ignora
+                self._future.cancel()
+            self._partial_text = partial_text
+            self._future = self._executor.submit(self._polish, partial_text)
+            self.metrics["speculations"] += 1
+
+    def reset(self) -> int:
+        """
+        Descarta la especulación en curso y empieza una nueva generación.
+
+        Returns:
+            Identificador de la nueva generación, para pasarlo a `start`.
+        """
+        with self._lock:
+            if self._future is not None:
+                self._future.cancel()
+            self._partial_text = None
+            self._future = None
+            self._generation += 1
+            return self._generation
+
+    def _patch(self, speculative_text: str, old_tail: str, new_tail: str) -> str:
+        # Llamada incremental: solo se pide ajustar el final del texto ya pulido
+        instruction = (
+            " Se te da un texto ya pulido a partir de un borrador de dictado cuyo final ha cambiado."
+            " Actualiza el texto pulido para que refleje el final correcto del dictado, cambiando lo mínimo posible."
+        )
+        request = (
+            f"Texto pulido:\n{speculative_text}\n\n"
+            f"Final del borrador: «{old_tail}»\n"
+            f"Final correcto: «{new_tail}»"
+        )
+        response = self.processor.process_text_with_gpt(
+            request,
+            model=self.patch_model,
+            system_message=self.system_message + instruction,
+            tag_output=True,
+            tag_name=self.tag_name
+        )
+        return self.processor._extract_tagged_content(response, self.tag_name)
+
+    def resolve(self, final_text: str) -> str:
+        """
+        Obtiene el texto pulido definitivo a partir de la transcripción final,
+        reutilizando la especulación cuando es posible.
+
+        Args:
+            final_text: Transcripción final del audio completo.
+
+        Returns:
+            Texto pulido.
+        """
+        final_arrived = time.perf_counter()
+        with self._lock:
+            partial_text, future = self._partial_text, self._future
+            self._partial_text, self._future = None, None
+            # Los parciales que terminen después ya no pertenecen a esta grabación
+            self._generation += 1
+
+        if future is None or future.cancelled():
+            self.metrics["without_speculation"] += 1
+            return self._polish(final_text)["text"]
+
+        self.metrics["resolved"] += 1
+        partial_words = _normalize_words(partial_text)
+        final_words = _normalize_words(final_text)
+
+        common = 0
+        for a, b in zip(partial_words, final_words):
+            if a != b:
+                break
+            common += 1
+        revised = len(partial_words) - common
+        added = len(final_words) - common
+
+        speculative = None
+        if revised <= self.max_revised_words and added <= self.max_new_words and common > 0:
+            try:
+                speculative = future.result()
+            except Exception:
+                speculative = None
+
+        if speculative is None:
+            # Especulación no aprovechable: pulir el texto final desde cero
+            future.cancel()
+            self.metrics["misses"] += 1
+            return self._polish(final_text)["text"]
+
+        if revised == 0 and added == 0:
+            self.metrics["hits"] += 1
+            result = speculative["text"]
+        else:
+            # Usar las palabras originales (con puntuación) para el contexto de la corrección
+            raw_partial = partial_text.split()
+            raw_final = final_text.split()
+            context = max(0, common - 3)
+            old_tail = " ".join(raw_partial[context:])
+            new_tail = " ".join(raw_final[context:])
+            try:
+                result = self._patch(speculative["text"], old_tail, new_tail)
+            except Exception:
+                self.metrics["misses"] += 1
+                return self._polish(final_text)["text"]
+            self.metrics["patched"] += 1
+
+        # Ahorro estimado: lo que habría tardado el pulido completo menos la espera real
+        waited = time.perf_counter() - final_arrived
+        self.metrics["saved_seconds"] += max(0.0, speculative["duration"] - waited)
+        return result
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Devuelve las métricas de especulación.
+
+        Returns:
+            Diccionario con contadores, tasa de acierto y segundos ahorrados.
+        """
+        metrics = dict(self.metrics)
+        resolved = metrics["resolved"]
+        metrics["hit_rate"] = round((metrics["hits"] + metrics["patched"]) / resolved, 3) if resolved else 0.0
+        metrics["saved_seconds"] = round(metrics["saved_seconds"], 3)
+        return metrics
+
+    def close(self):
+        self.reset()
+        self._executor.shutdown(wait=False)
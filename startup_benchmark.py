@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional, Dict, List, Tuple
+
+# Directorio del proyecto (donde está voice_to_cursor.py)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output: str, module: str) -> Tuple[Optional[float], Dict[str, float]]:
+    """
+    Interpreta la salida de `python -X importtime`.
+
+    Args:
+        output: Texto escrito por el intérprete en stderr.
+        module: Módulo cuyo desglose se desea obtener.
+
+    Returns:
+        Tupla con (tiempo acumulado en ms del módulo, tiempo acumulado en ms
+        de cada una de sus importaciones directas).
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            _self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        # La indentación indica el nivel de anidamiento de la importación
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative_us) / 1000.0))
+
+    # importtime escribe cada módulo después de sus dependencias: las
+    # importaciones directas son las de nivel 1 que preceden al módulo
+    for index, (depth, name, ms) in enumerate(entries):
+        if depth == 0 and name == module:
+            breakdown = {}
+            for child_depth, child_name, child_ms in reversed(entries[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    breakdown[child_name] = child_ms
+            return ms, breakdown
+    return None, {}
+
+
+def measure_import_time(module: str = "voice_to_cursor", runs: int = 5) -> Dict[str, object]:
+    """
+    Mide el tiempo de importación del módulo en intérpretes nuevos.
+
+    Args:
+        module: Módulo a importar.
+        runs: Número de repeticiones (se usa la mediana).
+
+    Returns:
+        Diccionario con el tiempo total en ms y el desglose por importación directa.
+    """
+    totals = []
+    breakdown: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+        total, children = parse_importtime(result.stderr, module)
+        if total is None:
+            raise RuntimeError(f"No se encontró {module} en la salida de -X importtime")
+        totals.append(total)
+        for name, ms in children.items():
+            breakdown.setdefault(name, []).append(ms)
+
+    return {
+        "total_ms": round(statistics.median(totals), 2),
+        "breakdown_ms": {name: round(statistics.median(values), 2) for name, values in breakdown.items()},
+    }
+
+
+def measure_first_frame(runs: int = 3, timeout: float = 60.0) -> Optional[float]:
+    """
+    Mide el tiempo desde el lanzamiento del proceso hasta el primer frame de la ventana.
+
+    Args:
+        runs: Número de repeticiones (se usa la mediana).
+        timeout: Tiempo máximo de espera por ejecución en segundos.
+
+    Returns:
+        Tiempo hasta el primer frame en ms, o None si no hay pantalla disponible.
+    """
+    env = dict(os.environ)
+    env["VOICE_TO_CURSOR_STARTUP_PROBE"] = "1"
+    # La API key solo se valida al arrancar; no se realizan llamadas a la API
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+
+    samples = []
+    for _ in range(runs):
+        launched = time.time()
+        result = subprocess.run(
+            [sys.executable, "voice_to_cursor.py"],
+            cwd=PROJECT_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        frame_lines = [line for line in result.stdout.splitlines() if line.startswith("FIRST_FRAME ")]
+        if not frame_lines:
+            print(f"No se pudo medir el primer frame:\n{result.stderr[-2000:]}", file=sys.stderr)
+            return None
+        samples.append((float(frame_lines[0].split()[1]) - launched) * 1000.0)
+
+    return round(statistics.median(samples), 2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de voice_to_cursor.py.")
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones por medición")
+    parser.add_argument("--top", type=int, default=15, help="Módulos más lentos a mostrar")
+    parser.add_argument("--max-import-ms", type=float, help="Falla si la importación supera este tiempo")
+    parser.add_argument("--max-first-frame-ms", type=float, help="Falla si el primer frame supera este tiempo")
+    parser.add_argument("--skip-first-frame", action="store_true", help="No medir el primer frame (sin pantalla)")
+    parser.add_argument("--json", action="store_true", help="Salida en formato JSON")
+    args = parser.parse_args(argv)
+
+    imports = measure_import_time(runs=args.runs)
+    first_frame = None if args.skip_first_frame else measure_first_frame(runs=max(1, args.runs // 2))
+
+    failures = []
+    if args.max_import_ms is not None and imports["total_ms"] > args.max_import_ms:
+        failures.append(f"importación: {imports['total_ms']} ms > {args.max_import_ms} ms")
+    if args.max_first_frame_ms is not None and first_frame is not None and first_frame > args.max_first_frame_ms:
+        failures.append(f"primer frame: {first_frame} ms > {args.max_first_frame_ms} ms")
+
+    if args.json:
+        print(json.dumps({
+            "import": imports,
+            "first_frame_ms": first_frame,
+            "failures": failures
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"Importación de voice_to_cursor: {imports['total_ms']} ms")
+        slowest = sorted(imports["breakdown_ms"].items(), key=lambda item: item[1], reverse=True)
+        for name, ms in slowest[:args.top]:
+            print(f"  {ms:9.2f} ms  {name}")
+        if first_frame is not None:
+            print(f"Primer frame: {first_frame} ms")
+        for failure in failures:
+            print(f"REGRESIÓN: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import functools
+import importlib.util
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, BinaryIO, Union, List, Sequence
+
+
+class TranscriptionBackend:
+    """
+    Interfaz base para los motores de transcripción.
+    Las subclases solo necesitan implementar `transcribe`; las variantes
+    asíncrona y por lotes se construyen sobre ella.
+    """
+
+    # Nombre con el que se registra el backend (se muestra en la interfaz)
+    name = "base"
+    # Los backends ocultos (solo para pruebas) no se ofrecen en la interfaz
+    hidden = False
+
+    @classmethod
+    def available_models(cls) -> List[str]:
+        """
+        Devuelve la lista de modelos soportados por este backend.
+
+        Returns:
+            Lista de identificadores de modelo.
+        """
+        return []
+
+    def transcribe(self,
+                   audio_file: Union[str, BinaryIO],
+                   model: Optional[str] = None,
+                   language: Optional[str] = None,
+                   prompt: Optional[str] = None,
+                   response_format: str = "text",
+                   temperature: Optional[float] = None) -> str:
+        """
+        Transcribe un archivo de audio.
+
+        Args:
+            audio_file: Ruta al archivo de audio o archivo abierto en modo binario.
+            model: Modelo a utilizar. Si es None se usa el modelo por defecto del backend.
+            language: Código de idioma opcional.
+            prompt: Texto opcional para guiar la transcripción.
+            response_format: Formato de respuesta (default: "text").
+            temperature: Aleatoriedad de la transcripción (0-1).
+
+        Returns:
+            Texto transcrito del audio.
+        """
+        raise NotImplementedError
+
+    async def transcribe_async(self, audio_file: Union[str, BinaryIO], **kwargs) -> str:
+        """
+        Versión asíncrona de `transcribe`. Por defecto ejecuta la llamada
+        bloqueante en un hilo para no bloquear el bucle de eventos.
+
+        Args:
+            audio_file: Ruta al archivo de audio o archivo abierto en modo binario.
+            **kwargs: Mismos parámetros que `transcribe`.
+
+        Returns:
+            Texto transcrito del audio.
+        """
+        # Importación diferida: la interfaz carga este módulo al arrancar y
+        # asyncio/concurrent.futures arrastran ssl y logging
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.transcribe, audio_file, **kwargs))
+
+    def transcribe_batch(self,
+                         audio_files: Sequence[Union[str, BinaryIO]],
+                         max_workers: int = 4,
+                         **kwargs) -> List[str]:
+        """
+        Transcribe varios archivos de audio de forma concurrente.
+
+        Args:
+            audio_files: Lista de rutas o archivos abiertos en modo binario.
+            max_workers: Número máximo de transcripciones simultáneas.
+            **kwargs: Mismos parámetros que `transcribe`.
+
+        Returns:
+            Lista de textos transcritos, en el mismo orden que `audio_files`.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if not audio_files:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(self.transcribe, f, **kwargs) for f in audio_files]
+            return [future.result() for future in futures]
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """
+    Backend que usa la API de transcripción de OpenAI.
+    """
+
+    name = "openai"
+
+    WHISPER_MODEL = "whisper-1"
+    GPT4O_MINI_TRANSCRIBE = "gpt-4o-mini-transcribe"
+
+    def __init__(self, client):
+        """
+        Inicializa el backend de OpenAI.
+
+        Args:
+            client: Cliente `openai.OpenAI` ya configurado.
+        """
+        self.client = client
+
+    @classmethod
+    def available_models(cls) -> List[str]:
+        return [cls.WHISPER_MODEL, cls.GPT4O_MINI_TRANSCRIBE]
+
+    def transcribe(self,
+                   audio_file: Union[str, BinaryIO],
+                   model: Optional[str] = None,
+                   language: Optional[str] = None,
+                   prompt: Optional[str] = None,
+                   response_format: str = "text",
+                   temperature: Optional[float] = None) -> str:
+        # Si audio_file es una ruta de archivo, abrirlo
+        file_obj = None
+        try:
+            if isinstance(audio_file, str):
+                file_obj = open(audio_file, "rb")
+                file_to_use = file_obj
+            else:
+                file_to_use = audio_file
+
+            # Preparar los parámetros para la transcripción
+            params = {
+                "model": model or self.WHISPER_MODEL,
+                "file": file_to_use,
+                "response_format": response_format
+            }
+
+            # Añadir parámetros opcionales si se proporcionan
+            if language:
+                params["language"] = language
+            if prompt:
+                params["prompt"] = prompt
+            if temperature is not None:
+                params["temperature"] = temperature
+
+            # Realizar la transcripción
+            transcript = self.client.audio.transcriptions.create(**params)
+
+            # Manejar diferentes tipos de respuesta: objeto con atributo text,
+            # string directo o diccionario con clave 'text'
+            if hasattr(transcript, 'text'):
+                return transcript.text
+            elif isinstance(transcript, str):
+                return transcript
+            elif isinstance(transcript, dict) and 'text' in transcript:
+                return transcript['text']
+            else:
+                # Intentar convertir a string como último recurso
+                return str(transcript)
+
+        finally:
+            # Cerrar el archivo si lo abrimos aquí
+            if file_obj:
+                file_obj.close()
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Backend de transcripción local en CPU basado en faster-whisper
+    (CTranslate2 con pesos cuantizados). No requiere conexión de red.
+    """
+
+    name = "local"
+
+    LOCAL_MODELS = ["tiny", "base", "small", "medium"]
+
+    MISSING_DEPENDENCY_MESSAGE = (
+        "El backend local requiere el paquete 'faster-whisper'. "
+        "Instálalo con: pip install faster-whisper"
+    )
+
+    def __init__(self,
+                 default_model: str = "base",
+                 compute_type: str = "int8",
+                 cpu_threads: int = 0,
+                 preload: bool = False):
+        """
+        Inicializa el backend local.
+
+        Args:
+            default_model: Tamaño de modelo a usar cuando no se indica uno válido.
+            compute_type: Tipo de cuantización de CTranslate2 (ej: "int8", "float32").
+            cpu_threads: Hilos de CPU a usar (0 = valor por defecto de la librería).
+            preload: Si se debe cargar el modelo por defecto inmediatamente.
+
+        Raises:
+            ImportError: Si no está instalado 'faster-whisper'.
+        """
+        # Comprobar la dependencia al elegir el backend y no en la primera transcripción
+        if importlib.util.find_spec("faster_whisper") is None:
+            raise ImportError(self.MISSING_DEPENDENCY_MESSAGE)
+        self.default_model = default_model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if preload:
+            self._get_model(default_model)
+
+    @classmethod
+    def available_models(cls) -> List[str]:
+        return list(cls.LOCAL_MODELS)
+
+    def _get_model(self, model: str):
+        """
+        Carga (una sola vez) y devuelve el modelo local solicitado.
+        """
+        with self._lock:
+            if model not in self._models:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError:
+                    raise ImportError(self.MISSING_DEPENDENCY_MESSAGE)
+                self._models[model] = WhisperModel(
+                    model,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads
+                )
+            return self._models[model]
+
+    def transcribe(self,
+                   audio_file: Union[str, BinaryIO],
+                   model: Optional[str] = None,
+                   language: Optional[str] = None,
+                   prompt: Optional[str] = None,
+                   response_format: str = "text",
+                   temperature: Optional[float] = None) -> str:
+        # Los modelos de OpenAI no existen en local: usar el modelo por defecto
+        if model not in self.LOCAL_MODELS:
+            model = self.default_model
+
+        params: Dict[str, Any] = {"beam_size": 1}
+        if language:
+            params["language"] = language
+        if prompt:
+            params["initial_prompt"] = prompt
+        if temperature is not None:
+            params["temperature"] = temperature
+
+        segments, _info = self._get_model(model).transcribe(audio_file, **params)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class FakeTranscriptionBackend(TranscriptionBackend):
+    """
+    Backend determinista para pruebas: no realiza llamadas de red ni
+    carga modelos. Devuelve respuestas predefinidas por nombre de archivo
+    o una respuesta por defecto.
+    """
+
+    name = "fake"
+    hidden = True
+
+    def __init__(self,
+                 responses: Optional[Dict[str, str]] = None,
+                 default_response: str = "texto de prueba",
+                 delay: float = 0.0):
+        """
+        Inicializa el backend falso.
+
+        Args:
+            responses: Diccionario {nombre de archivo: texto} con respuestas fijas.
+            default_response: Texto devuelto cuando el archivo no está en `responses`.
+            delay: Retardo artificial en segundos para simular latencia.
+        """
+        self.responses = responses or {}
+        self.default_response = default_response
+        self.delay = delay
+        self.calls: List[Dict[str, Any]] = []
+
+    @classmethod
+    def available_models(cls) -> List[str]:
+        return ["fake"]
+
+    def transcribe(self,
+                   audio_file: Union[str, BinaryIO],
+                   model: Optional[str] = None,
+                   language: Optional[str] = None,
+                   prompt: Optional[str] = None,
+                   response_format: str = "text",
+                   temperature: Optional[float] = None) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+
+        key = audio_file if isinstance(audio_file, str) else getattr(audio_file, "name", "")
+        self.calls.append({
+            "audio_file": key,
+            "model": model,
+            "language": language,
+            "prompt": prompt
+        })
+        return self.responses.get(os.path.basename(str(key)), self.default_response)
+
+
+# Registro de backends disponibles por nombre
+BACKENDS = {
+    OpenAITranscriptionBackend.name: OpenAITranscriptionBackend,
+    LocalWhisperBackend.name: LocalWhisperBackend,
+    FakeTranscriptionBackend.name: FakeTranscriptionBackend,
+}
+
+
+def get_available_backends(include_hidden: bool = True) -> List[str]:
+    """
+    Devuelve los nombres de los backends de transcripción registrados.
+
+    Args:
+        include_hidden: Si se incluyen los backends solo para pruebas (ej: "fake").
+
+    Returns:
+        Lista de nombres de backend.
+    """
+    return [name for name, backend in BACKENDS.items() if include_hidden or not backend.hidden]
+
+
+def get_backend_models(name: str) -> List[str]:
+    """
+    Devuelve los modelos de un backend sin necesidad de instanciarlo.
+
+    Args:
+        name: Nombre del backend.
+
+    Returns:
+        Lista de modelos soportados por el backend.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de transcripción desconocido: {name}")
+    return BACKENDS[name].available_models()
+
+
+def create_backend(name: str, **kwargs) -> TranscriptionBackend:
+    """
+    Crea un backend de transcripción por nombre.
+
+    Args:
+        name: Nombre del backend ("openai", "local" o "fake").
+        **kwargs: Argumentos para el constructor del backend.
+
+    Returns:
+        Instancia del backend solicitado.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de transcripción desconocido: {name}")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Nombre de la carpeta de datos de la aplicación
+APP_DIR_NAME = "VoiceToCursor"
+
+
+def get_user_data_dir() -> str:
+    """
+    Devuelve la carpeta de datos del usuario (historial, secuencias...), fuera
+    del código fuente para que los dictados no acaben en el repositorio.
+
+    Se puede cambiar con la variable de entorno VOICE_TO_CURSOR_DATA_DIR. La
+    carpeta no se crea aquí; se crea al escribir el primer archivo.
+
+    Returns:
+        Ruta absoluta a la carpeta de datos.
+    """
+    override = os.getenv("VOICE_TO_CURSOR_DATA_DIR")
+    if override:
+        return os.path.abspath(os.path.expanduser(override))
+
+    if sys.platform == "win32":
+        base = os.getenv("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, APP_DIR_NAME)
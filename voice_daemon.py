@@ -0,0 +1,368 @@
+import argparse
+import asyncio
+import functools
+import io
+import json
+import os
+import sys
+import time
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from dotenv import load_dotenv
+
+from gpt_audio_processor import GPTAudioProcessor, CURSOR_SYSTEM_MESSAGE, CURSOR_PROMPT_TEMPLATE
+from polish_batcher import PolishBatcher
+from project_explorer import get_project_transcription_prompt
+from transcription_backends import get_available_backends
+
+# Códigos de estado HTTP usados por el servidor
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class VoiceDaemon:
+    """
+    Servicio residente que mantiene un GPTAudioProcessor y el prompt del
+    proyecto en memoria y atiende peticiones de audio a prompt a través de
+    HTTP local (TCP en localhost o socket de dominio Unix).
+
+    Endpoints:
+        GET  /health   Estado del servicio.
+        POST /process  Cuerpo: audio. Respuesta: eventos NDJSON en streaming
+                       ("transcribed", "polished" o "error").
+        POST /refresh  Vuelve a explorar el proyecto configurado.
+    """
+
+    def __init__(self,
+                 processor: GPTAudioProcessor,
+                 project_path: Optional[str] = None,
+                 max_concurrency: int = 4,
+                 max_pending: int = 32,
+                 max_body_bytes: int = 25 * 1024 * 1024,
+                 transcription_model: str = GPTAudioProcessor.WHISPER_MODEL,
+                 process_model: str = "gpt-3.5-turbo",
+                 language: Optional[str] = "es",
+                 polish_batcher: Optional[PolishBatcher] = None):
+        """
+        Inicializa el servicio.
+
+        Args:
+            processor: Procesador de audio ya inicializado.
+            project_path: Ruta del proyecto para generar el prompt de transcripción.
+            max_concurrency: Peticiones procesadas simultáneamente.
+            max_pending: Peticiones admitidas (en proceso + en espera) antes de rechazar con 503.
+            max_body_bytes: Tamaño máximo del audio recibido.
+            transcription_model: Modelo de transcripción por defecto.
+            process_model: Modelo GPT por defecto.
+            language: Idioma por defecto para la transcripción.
+            polish_batcher: Agrupador opcional para pulir varios textos en una sola petición.
+        """
+        self.processor = processor
+        self.project_path = project_path
+        self.project_prompt: Optional[str] = None
+        self.polish_batcher = polish_batcher
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+        self.defaults = {
+            "transcription_model": transcription_model,
+            "process_model": process_model,
+            "language": language,
+        }
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._pending = 0
+        self._servers = []
+        self.stats = {"requests": 0, "completed": 0, "rejected": 0, "errors": 0}
+
+    async def refresh_project_prompt(self) -> Optional[str]:
+        """
+        Regenera el prompt de transcripción del proyecto en un hilo.
+
+        Returns:
+            El prompt generado, o None si no hay proyecto configurado.
+        """
+        if self.project_path:
+            loop = asyncio.get_running_loop()
+            self.project_prompt = await loop.run_in_executor(
+                None, get_project_transcription_prompt, self.project_path
+            )
+        return self.project_prompt
+
+    async def start(self, host: Optional[str] = "127.0.0.1", port: Optional[int] = 8765,
+                    unix_path: Optional[str] = None):
+        """
+        Arranca los servidores configurados y precalienta el índice del proyecto.
+
+        Args:
+            host: Interfaz TCP (None para no escuchar por TCP).
+            port: Puerto TCP.
+            unix_path: Ruta del socket de dominio Unix (None para no usarlo).
+        """
+        await self.refresh_project_prompt()
+
+        if host is not None and port is not None:
+            self._servers.append(await asyncio.start_server(self._handle_client, host, port))
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self._servers.append(await asyncio.start_unix_server(self._handle_client, unix_path))
+        if not self._servers:
+            raise ValueError("Se debe indicar un puerto TCP o una ruta de socket Unix")
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str]]:
+        """
+        Lee la línea de petición y las cabeceras HTTP.
+        """
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise ValueError("Línea de petición inválida")
+        method, target, _version = parts
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _send_event(self, writer: asyncio.StreamWriter, event: Dict[str, Any]):
+        # Cada evento es una línea NDJSON enviada como un chunk HTTP
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+        writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b"\r\n")
+        # drain() aplica contrapresión si el cliente lee más lento de lo que producimos
+        await writer.drain()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, target, headers = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._send_json(writer, 400, {"error": "Petición HTTP inválida"})
+                return
+
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if url.path == "/health":
+                await self._send_json(writer, 200, {
+                    "status": "ok",
+                    "pending": self._pending,
+                    "backend": self.processor.transcription_backend.name,
+                    "project_prompt": self.project_prompt is not None,
+                    "batching": self.polish_batcher.get_stats() if self.polish_batcher else None,
+                    **self.stats
+                })
+            elif url.path == "/refresh" and method == "POST":
+                await self.refresh_project_prompt()
+                await self._send_json(writer, 200, {"status": "ok"})
+            elif url.path == "/process":
+                if method != "POST":
+                    await self._send_json(writer, 405, {"error": "Use POST"})
+                    return
+                await self._handle_process(reader, writer, headers, query)
+            else:
+                await self._send_json(writer, 404, {"error": "Ruta no encontrada"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # El cliente cerró la conexión: no hay nada que responder
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_process(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                              headers: Dict[str, str], query: Dict[str, str]):
+        self.stats["requests"] += 1
+
+        if "content-length" not in headers:
+            await self._send_json(writer, 411, {"error": "Se requiere Content-Length"})
+            return
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "Content-Length inválido"})
+            return
+        if length <= 0 or length > self.max_body_bytes:
+            await self._send_json(writer, 413, {"error": "Tamaño de audio no válido"})
+            return
+
+        # Rechazar en lugar de encolar sin límite cuando el servicio está saturado
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            await self._send_json(writer, 503, {"error": "Servicio saturado, reintente más tarde"})
+            return
+
+        self._pending += 1
+        try:
+            audio = io.BytesIO(await reader.readexactly(length))
+            # La API de OpenAI deduce el formato por la extensión del nombre
+            audio.name = "audio." + query.get("format", "wav")
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+                b"Transfer-Encoding: chunked\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+
+            async with self._semaphore:
+                await self._run_pipeline(writer, audio, query)
+
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self._pending -= 1
+
+    async def _run_pipeline(self, writer: asyncio.StreamWriter, audio: io.BytesIO, query: Dict[str, str]):
+        """
+        Ejecuta transcripción y pulido enviando cada resultado en cuanto está disponible.
+        """
+        language = query.get("language", self.defaults["language"]) or None
+        transcription_prompt = query.get("prompt") or self.project_prompt
+        start = time.perf_counter()
+        try:
+            text = await self.processor.transcribe_audio_async(
+                audio,
+                model=query.get("transcription_model", self.defaults["transcription_model"]),
+                language=language,
+                prompt=transcription_prompt
+            )
+            await self._send_event(writer, {
+                "event": "transcribed",
+                "text": text,
+                "elapsed": round(time.perf_counter() - start, 3)
+            })
+
+            if query.get("polish", "1") == "0":
+                self.stats["completed"] += 1
+                return
+
+            process_model = query.get("process_model", self.defaults["process_model"])
+            if self.polish_batcher is not None and process_model == self.polish_batcher.process_model:
+                # Se agrupa con otras peticiones que lleguen dentro de la ventana del lote
+                polished = await asyncio.wrap_future(self.polish_batcher.submit(text))
+            else:
+                loop = asyncio.get_running_loop()
+                polished = await loop.run_in_executor(None, functools.partial(
+                    self.processor.polish_text,
+                    text,
+                    process_model=process_model,
+                    system_message=CURSOR_SYSTEM_MESSAGE,
+                    prompt_template=CURSOR_PROMPT_TEMPLATE,
+                    tag_name="text_to_cursor",
+                    clean_response=True
+                ))
+            await self._send_event(writer, {
+                "event": "polished",
+                "text": polished,
+                "elapsed": round(time.perf_counter() - start, 3)
+            })
+            self.stats["completed"] += 1
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            await self._send_event(writer, {"event": "error", "error": str(e)})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Servicio local de audio a prompt para Cursor.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz TCP (solo localhost recomendado)")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto TCP (0 para desactivar TCP)")
+    parser.add_argument("--unix", help="Ruta del socket de dominio Unix")
+    parser.add_argument("--project", help="Ruta del proyecto para el prompt de transcripción")
+    parser.add_argument("--backend", default="openai", choices=get_available_backends(),
+                        help="Motor de transcripción")
+    parser.add_argument("--transcription-model", default=GPTAudioProcessor.WHISPER_MODEL)
+    parser.add_argument("--process-model", default="gpt-3.5-turbo")
+    parser.add_argument("--language", default="es")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--batch-window-ms", type=int, default=0,
+                        help="Agrupar el pulido de textos que lleguen dentro de esta ventana (0 = desactivado)")
+    return parser
+
+
+async def _main(args: argparse.Namespace):
+    processor = GPTAudioProcessor()
+    processor.set_transcription_backend(args.backend)
+
+    polish_batcher = None
+    if args.batch_window_ms > 0:
+        polish_batcher = PolishBatcher(
+            processor,
+            process_model=args.process_model,
+            system_message=CURSOR_SYSTEM_MESSAGE,
+            prompt_template=CURSOR_PROMPT_TEMPLATE,
+            tag_name="text_to_cursor",
+            window_ms=args.batch_window_ms
+        )
+
+    daemon = VoiceDaemon(
+        processor,
+        project_path=args.project,
+        max_concurrency=args.max_concurrency,
+        max_pending=args.max_pending,
+        transcription_model=args.transcription_model,
+        process_model=args.process_model,
+        language=args.language or None,
+        polish_batcher=polish_batcher
+    )
+    await daemon.start(
+        host=args.host if args.port else None,
+        port=args.port or None,
+        unix_path=args.unix
+    )
+    print("Servicio escuchando en: " + ", ".join(
+        str(sock.getsockname()) for server in daemon._servers for sock in server.sockets
+    ), file=sys.stderr)
+    try:
+        await daemon.serve_forever()
+    finally:
+        await daemon.close()
+        if polish_batcher is not None:
+            polish_batcher.close()
+
+
+def main(argv=None):
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
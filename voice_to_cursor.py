@@ -1,22 +1,47 @@
 import tkinter as tk
-from tkinter import messagebox, StringVar, OptionMenu, Frame, Label, Entry, Checkbutton, BooleanVar, Text, Scrollbar
-import sounddevice as sd
-import numpy as np
-import scipy.io.wavfile as wav
+from tkinter import messagebox, filedialog, StringVar, OptionMenu, Frame, Label, Entry, Checkbutton, BooleanVar, Text, Scrollbar
+import importlib
 import os
+import queue
+import threading
 from dotenv import load_dotenv
-import pyperclip
 from datetime import datetime
 import time
-from audio_controller import AudioController
-import pyautogui
-from pc_controller import PcController
-from gpt_audio_processor import GPTAudioProcessor
-from project_explorer import get_project_transcription_prompt
+from transcription_backends import get_available_backends, get_backend_models
+from project_explorer import get_project_transcription_prompt, ScanCancelled
+from macro_engine import load_macros, DEFAULT_MACRO_NAME
+from cursor_tracker import CursorTracker, PyAutoGUIPositionSource
+
+# Las dependencias pesadas (sounddevice, numpy, scipy, openai, pyautogui,
+# pyperclip, pycaw) se importan bajo demanda para que la ventana aparezca
+# cuanto antes. Estos módulos se precargan en segundo plano tras el primer frame.
+WARM_UP_MODULES = [
+    "numpy",
+    "sounddevice",
+    "scipy.io.wavfile",
+    "pyperclip",
+    "pyautogui",
+    "gpt_audio_processor",
+]
+
+# Transcripciones parciales para el pulido especulativo: la primera a los 4 s
+# y cada una tras el doble de grabación que la anterior (4, 8, 16, 32 s). Como
+# cada parcial reenvía todo lo grabado, así el coste total queda por debajo del
+# doble del audio en lugar de crecer con el cuadrado de su duración.
+PARTIAL_TRANSCRIPTION_INTERVAL_MS = 4000
+MAX_PARTIAL_TRANSCRIPTIONS = 4
 
 # Cargar variables de entorno
 load_dotenv()
 
+def get_configured_project_paths():
+    """
+    Obtiene las rutas de proyecto configuradas en la variable PROJECT_PATHS
+    (separadas por os.pathsep). Si no hay ninguna, usa el directorio actual.
+    """
+    paths = [p.strip() for p in os.getenv('PROJECT_PATHS', '').split(os.pathsep) if p.strip()]
+    return paths or [os.getcwd()]
+
 class VoiceRecorder:
     def __init__(self):
         self.root = tk.Tk()
@@ -34,16 +59,35 @@ class VoiceRecorder:
         self.audio_data = []
         self.sample_rate = 44100
         self.capturando = False
-        self.project_path = r"D:\CursorDeployments\Voice to cursor"  # Ruta al proyecto
-        
-        # Inicializar el procesador de audio GPT
-        self.gpt_processor = GPTAudioProcessor(api_key=self.api_key)
-        
-        # Crear instancia de AudioController
-        self.audio_ctrl = AudioController()
-        
-        # Crear instancia de PcController
-        self.pc_ctrl = PcController()
+        self.persistent_capture = None  # Captura continua con pre-roll (opcional)
+        self._recording_capture = None  # Captura usada por la grabación en curso
+        self.project_paths = get_configured_project_paths()  # Rutas de proyecto configuradas
+        self._explore_thread = None
+        self._explore_cancel = None
+        self._explore_events = queue.Queue()
+        
+        # Subsistemas que se construyen bajo demanda (ver propiedades)
+        self._gpt_processor = None
+        self._gpt_processor_lock = threading.Lock()
+        self._audio_ctrl = None
+        self._pc_ctrl = None
+        self._macro_engine = None
+        self._speculative_polisher = None
+        self._history = None
+        self.history_window = None
+        self._partial_thread = None
+        self._partial_job = None
+        self._partial_count = 0
+        self._speculation_generation = None
+        self._macro_results = queue.Queue()
+        
+        # Secuencias guardadas por el usuario
+        try:
+            self.macros = load_macros()
+        except Exception as e:
+            print(f"Error al cargar las secuencias guardadas: {e}")
+            self.macros = load_macros(path="")
+        self._warm_up_thread = None
         
         # Configurar el botón de grabación
         self.button = tk.Button(
@@ -63,6 +107,15 @@ class VoiceRecorder:
         )
         self.coords_label.pack(pady=5)
         
+        # Seguimiento del cursor con sondeo adaptativo (se inicia tras la precarga)
+        self.cursor_tracker = CursorTracker(
+            PyAutoGUIPositionSource(),
+            on_change=self.update_cursor_position,
+            schedule=self.root.after,
+            cancel=self.root.after_cancel,
+            is_visible=self.is_window_visible
+        )
+        
         # Frame para la captura de coordenadas
         capture_frame = tk.Frame(self.root)
         capture_frame.pack(pady=5)
@@ -94,6 +147,25 @@ class VoiceRecorder:
         )
         self.execute_button.pack(pady=5)
         
+        # Secuencia a ejecutar
+        macro_frame = tk.Frame(self.root)
+        macro_frame.pack(pady=5)
+        
+        tk.Label(macro_frame, text="Secuencia:").pack(side=tk.LEFT, padx=5)
+        
+        self.macro_var = StringVar(self.root)
+        self.macro_var.set(DEFAULT_MACRO_NAME)
+        
+        OptionMenu(macro_frame, self.macro_var, *self.macros.keys()).pack(side=tk.LEFT, padx=5)
+        
+        # Historial de dictados con búsqueda para reenviar textos anteriores
+        tk.Button(
+            self.root,
+            text="Historial...",
+            command=self.open_history,
+            width=20
+        ).pack(pady=5)
+        
         # Separador
         separator = tk.Frame(self.root, height=2, bd=1, relief=tk.SUNKEN)
         separator.pack(fill=tk.X, padx=5, pady=10)
@@ -102,6 +174,19 @@ class VoiceRecorder:
         options_frame = tk.LabelFrame(self.root, text="Opciones Avanzadas", padx=10, pady=10)
         options_frame.pack(fill=tk.X, padx=10, pady=5)
         
+        # Backend de transcripción
+        backend_frame = tk.Frame(options_frame)
+        backend_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(backend_frame, text="Motor:").pack(side=tk.LEFT, padx=5)
+        
+        self.transcription_backend = StringVar(self.root)
+        self.transcription_backend.set("openai")
+        
+        backend_menu = OptionMenu(backend_frame, self.transcription_backend, *get_available_backends(include_hidden=False),
+                                  command=self.change_transcription_backend)
+        backend_menu.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
         # Modelo de transcripción
         models_frame = tk.Frame(options_frame)
         models_frame.pack(fill=tk.X, pady=5)
@@ -109,11 +194,25 @@ class VoiceRecorder:
         tk.Label(models_frame, text="Modelo:").pack(side=tk.LEFT, padx=5)
         
         self.transcription_model = StringVar(self.root)
-        available_models = self.gpt_processor.get_available_transcription_models()
+        available_models = get_backend_models(self.transcription_backend.get())
         self.transcription_model.set(available_models[0])  # valor por defecto
         
-        model_menu = OptionMenu(models_frame, self.transcription_model, *available_models)
-        model_menu.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.model_menu = OptionMenu(models_frame, self.transcription_model, *available_models)
+        self.model_menu.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        # Proyecto a explorar
+        project_frame = tk.Frame(options_frame)
+        project_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(project_frame, text="Proyecto:").pack(side=tk.LEFT, padx=5)
+        
+        self.project_path_var = StringVar(self.root)
+        self.project_path_var.set(self.project_paths[0])
+        
+        self.project_menu = OptionMenu(project_frame, self.project_path_var, *self.project_paths)
+        self.project_menu.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        tk.Button(project_frame, text="Añadir...", command=self.add_project_path).pack(side=tk.LEFT, padx=5)
         
         # Botón para explorar proyecto y generar prompt
         explore_frame = tk.Frame(options_frame)
@@ -127,6 +226,9 @@ class VoiceRecorder:
         )
         self.explore_button.pack(side=tk.TOP, pady=5)
         
+        self.explore_status = tk.Label(explore_frame, text="", font=("Arial", 9))
+        self.explore_status.pack(side=tk.TOP)
+        
         # Campo para prompt de transcripción con scroll
         prompt_frame = tk.Frame(options_frame)
         prompt_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -169,34 +271,245 @@ class VoiceRecorder:
         process_menu = OptionMenu(process_frame, self.process_model, *process_models)
         process_menu.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
+        # Captura continua con pre-roll
+        capture_mode_frame = tk.Frame(options_frame)
+        capture_mode_frame.pack(fill=tk.X, pady=5)
+        
+        self.persistent_capture_var = BooleanVar(self.root)
+        self.persistent_capture_var.set(False)
+        
+        Checkbutton(
+            capture_mode_frame,
+            text="Captura continua",
+            variable=self.persistent_capture_var,
+            command=self.toggle_persistent_capture
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(capture_mode_frame, text="Pre-roll (ms):").pack(side=tk.LEFT, padx=5)
+        
+        self.pre_roll_var = StringVar(self.root)
+        self.pre_roll_var.set("300")
+        
+        tk.Entry(capture_mode_frame, width=5, textvariable=self.pre_roll_var).pack(side=tk.LEFT, padx=5)
+        
+        # Volumen del sistema durante la grabación (0 = silencio total)
+        duck_frame = tk.Frame(options_frame)
+        duck_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(duck_frame, text="Volumen del sistema al grabar (%):").pack(side=tk.LEFT, padx=5)
+        
+        self.duck_level_var = StringVar(self.root)
+        self.duck_level_var.set("0")
+        
+        tk.Entry(duck_frame, width=5, textvariable=self.duck_level_var).pack(side=tk.LEFT, padx=5)
+        
+        # Pulido especulativo de transcripciones parciales
+        self.speculative_var = BooleanVar(self.root)
+        self.speculative_var.set(False)
+        
+        speculative_frame = tk.Frame(options_frame)
+        speculative_frame.pack(fill=tk.X, pady=5)
+        
+        Checkbutton(
+            speculative_frame,
+            text="Pulido especulativo (transcribe mientras grabas)",
+            variable=self.speculative_var
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.speculative_status = tk.Label(speculative_frame, text="", font=("Arial", 9))
+        self.speculative_status.pack(side=tk.LEFT, padx=5)
+        
+        # Precargar dependencias en segundo plano una vez mostrada la ventana;
+        # la actualización de coordenadas empieza cuando termina la precarga
+        self.root.after(100, self.start_warm_up)
+    
+    @property
+    def gpt_processor(self):
+        """Procesador de audio GPT (se crea en el primer uso)"""
+        with self._gpt_processor_lock:
+            if self._gpt_processor is None:
+                from gpt_audio_processor import GPTAudioProcessor
+                self._gpt_processor = GPTAudioProcessor(api_key=self.api_key)
+            return self._gpt_processor
+    
+    @property
+    def audio_ctrl(self):
+        """Controlador de volumen del sistema (se crea en el primer uso)"""
+        if self._audio_ctrl is None:
+            from audio_controller import AudioController
+            self._audio_ctrl = AudioController()
+        return self._audio_ctrl
+    
+    @property
+    def pc_ctrl(self):
+        """Controlador de ratón y teclado (se crea en el primer uso)"""
+        if self._pc_ctrl is None:
+            from pc_controller import PcController
+            # Las secuencias esperan por condición, basta una pausa mínima entre acciones
+            self._pc_ctrl = PcController(pausa=0.02)
+        return self._pc_ctrl
+    
+    @property
+    def speculative_polisher(self):
+        """Pulido especulativo sobre el procesador GPT (se crea en el primer uso)"""
+        if self._speculative_polisher is None:
+            from gpt_audio_processor import CURSOR_SYSTEM_MESSAGE, CURSOR_PROMPT_TEMPLATE
+            from speculative_polish import SpeculativePolisher
+            self._speculative_polisher = SpeculativePolisher(
+                self.gpt_processor,
+                system_message=CURSOR_SYSTEM_MESSAGE,
+                prompt_template=CURSOR_PROMPT_TEMPLATE,
+                tag_name="text_to_cursor"
+            )
+        return self._speculative_polisher
+    
+    @property
+    def history(self):
+        """Historial de dictados (se abre en el primer uso)"""
+        if self._history is None:
+            from history_store import HistoryStore
+            self._history = HistoryStore()
+        return self._history
+    
+    @property
+    def macro_engine(self):
+        """Motor de secuencias sobre PcController (se crea en el primer uso)"""
+        if self._macro_engine is None:
+            from macro_engine import MacroEngine
+            self._macro_engine = MacroEngine(self.pc_ctrl)
+        return self._macro_engine
+    
+    def start_warm_up(self):
+        """Inicia la precarga de dependencias en un hilo en segundo plano"""
+        self._warm_up_thread = threading.Thread(target=self._warm_up, daemon=True)
+        self._warm_up_thread.start()
+        self.root.after(50, self._finish_warm_up)
+    
+    def _warm_up(self):
+        for module in WARM_UP_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Error al precargar {module}: {e}")
+        try:
+            self.gpt_processor
+        except Exception as e:
+            print(f"Error al inicializar el procesador de audio: {e}")
+    
+    def _finish_warm_up(self):
+        # Esperar sin bloquear la interfaz a que termine el hilo de precarga
+        if self._warm_up_thread.is_alive():
+            self.root.after(50, self._finish_warm_up)
+            return
+        
+        # Crear los controladores ahora para que el primer uso no tenga latencia
+        for name in ("audio_ctrl", "pc_ctrl"):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                print(f"Error al inicializar {name}: {e}")
+        
         # Iniciar actualización de coordenadas
-        self.update_cursor_position()
+        self.cursor_tracker.start()
     
-    def explore_project(self):
+    def change_transcription_backend(self, backend_name):
         """
-        Explora el proyecto para generar un prompt de transcripción automático.
+        Cambia el backend de transcripción y actualiza la lista de modelos disponibles.
         """
         try:
-            # Mostrar indicador de carga
-            self.explore_button.config(text="Analizando...", state=tk.DISABLED)
-            self.root.update()
-            
-            # Obtener el prompt de transcripción basado en el proyecto
-            prompt = get_project_transcription_prompt(self.project_path)
-            
-            # Limpiar el campo de texto actual
-            self.transcription_prompt_text.delete(1.0, tk.END)
+            self.gpt_processor.set_transcription_backend(backend_name)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo activar el motor de transcripción: {str(e)}")
+            self.transcription_backend.set(self.gpt_processor.transcription_backend.name)
+            return
+        
+        # Reconstruir el menú de modelos con los del nuevo backend
+        available_models = get_backend_models(backend_name)
+        menu = self.model_menu["menu"]
+        menu.delete(0, tk.END)
+        for model in available_models:
+            menu.add_command(label=model, command=tk._setit(self.transcription_model, model))
+        self.transcription_model.set(available_models[0])
+    
+    def add_project_path(self):
+        """Añade una carpeta de proyecto a la lista (solo para esta sesión)"""
+        path = filedialog.askdirectory(title="Selecciona la carpeta del proyecto")
+        if not path:
+            return
+        if path not in self.project_paths:
+            self.project_paths.append(path)
+            self.project_menu["menu"].add_command(label=path, command=tk._setit(self.project_path_var, path))
+        self.project_path_var.set(path)
+    
+    def explore_project(self):
+        """
+        Explora el proyecto seleccionado en segundo plano para generar un prompt de transcripción automático.
+        Si ya hay una exploración en curso, la cancela.
+        """
+        if self._explore_thread is not None and self._explore_thread.is_alive():
+            self._explore_cancel.set()
+            self.explore_button.config(text="Cancelando...", state=tk.DISABLED)
+            return
+        
+        project_path = self.project_path_var.get()
+        self._explore_cancel = threading.Event()
+        events = self._explore_events
+        cancel_event = self._explore_cancel
+        
+        def worker():
+            # El hilo de trabajo solo comunica con la interfaz a través de la cola
+            try:
+                prompt = get_project_transcription_prompt(
+                    project_path,
+                    progress_callback=lambda files, functions: events.put(("progress", (files, functions))),
+                    cancel_event=cancel_event
+                )
+                events.put(("done", prompt))
+            except ScanCancelled:
+                events.put(("cancelled", None))
+            except Exception as e:
+                events.put(("error", e))
+        
+        self.explore_button.config(text="Cancelar")
+        self.explore_status.config(text="Analizando...")
+        self._explore_thread = threading.Thread(target=worker, daemon=True)
+        self._explore_thread.start()
+        self.root.after(50, self._check_explore_events)
+    
+    def _check_explore_events(self):
+        while True:
+            try:
+                kind, payload = self._explore_events.get_nowait()
+            except queue.Empty:
+                self.root.after(50, self._check_explore_events)
+                return
             
-            # Insertar el nuevo prompt
-            self.transcription_prompt_text.insert(tk.END, prompt)
+            if kind == "progress":
+                files, functions = payload
+                self.explore_status.config(text=f"Archivos: {files}, funciones: {functions}")
+                continue
             
-            # Mostrar mensaje de éxito
-            messagebox.showinfo("Éxito", "Proyecto analizado correctamente. El prompt de transcripción se ha actualizado.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al analizar el proyecto: {str(e)}")
-        finally:
             # Restaurar el botón
             self.explore_button.config(text="Explorar Proyecto", state=tk.NORMAL)
+            if kind == "done":
+                # Limpiar el campo de texto actual e insertar el nuevo prompt por partes
+                self.transcription_prompt_text.delete(1.0, tk.END)
+                self._insert_prompt_chunks(payload.splitlines(keepends=True), 0)
+            elif kind == "cancelled":
+                self.explore_status.config(text="Exploración cancelada")
+            else:
+                self.explore_status.config(text="")
+                messagebox.showerror("Error", f"Error al analizar el proyecto: {str(payload)}")
+            return
+    
+    def _insert_prompt_chunks(self, lines, start, chunk_size=200):
+        # Insertar bloques de líneas en sucesivas iteraciones del bucle de eventos
+        # para que un prompt grande no congele la ventana
+        self.transcription_prompt_text.insert(tk.END, "".join(lines[start:start + chunk_size]))
+        if start + chunk_size < len(lines):
+            self.root.after(1, self._insert_prompt_chunks, lines, start + chunk_size, chunk_size)
+        else:
+            self.explore_status.config(text="Proyecto analizado correctamente. El prompt de transcripción se ha actualizado.")
     
     def toggle_recording(self):
         if not self.recording:
@@ -204,11 +517,73 @@ class VoiceRecorder:
         else:
             self.stop_recording()
     
+    def toggle_persistent_capture(self):
+        """Abre o cierra el stream de entrada persistente"""
+        if self.persistent_capture_var.get():
+            if self.persistent_capture is not None:
+                # Desactivada y reactivada durante una grabación: sigue abierta
+                return
+            try:
+                from audio_capture import PersistentCapture
+                self.persistent_capture = PersistentCapture(sample_rate=self.sample_rate)
+                self.persistent_capture.open()
+            except Exception as e:
+                self.persistent_capture = None
+                self.persistent_capture_var.set(False)
+                messagebox.showerror("Error", f"No se pudo abrir el micrófono: {str(e)}")
+        elif self.persistent_capture is not None and self.persistent_capture is not self._recording_capture:
+            # Si la grabación en curso la está usando, se cierra al detenerla
+            self.persistent_capture.close()
+            self.persistent_capture = None
+    
+    def get_pre_roll_ms(self):
+        """Obtiene el pre-roll configurado en milisegundos"""
+        try:
+            return max(0, int(self.pre_roll_var.get()))
+        except ValueError:
+            return 0
+    
+    def get_duck_level(self):
+        """Obtiene la fracción del volumen del sistema que se mantiene al grabar"""
+        try:
+            return min(100, max(0, float(self.duck_level_var.get()))) / 100
+        except ValueError:
+            return 0.0
+    
+    def _report_audio_ctrl_error(self, future):
+        # Se llama desde el hilo del controlador de audio: solo registrar el error
+        error = future.exception()
+        if error is not None:
+            print(f"Error al controlar el volumen del sistema: {error}")
+    
     def start_recording(self):
+        # No seguir el cursor mientras se graba y procesa el audio
+        self.cursor_tracker.pause()
         self.recording = True
         self.button.config(text="Detener Grabación")
         self.audio_data = []
-        self.audio_ctrl.silence()
+        
+        # Silenciar/atenuar el sistema en paralelo con la apertura del stream
+        self.audio_ctrl.duck_level = self.get_duck_level()
+        self.audio_ctrl.silence_async().add_done_callback(self._report_audio_ctrl_error)
+        
+        # Transcribir periódicamente lo grabado para empezar a pulir antes de terminar
+        if self.speculative_var.get():
+            self._speculation_generation = self.speculative_polisher.reset()
+            self.speculative_polisher.process_model = self.process_model.get()
+            self._partial_count = 0
+            self._partial_job = self.root.after(PARTIAL_TRANSCRIPTION_INTERVAL_MS, self._transcribe_partial)
+        
+        # El modo de captura se fija al empezar: cambiar la casilla durante la
+        # grabación solo afecta a la siguiente
+        self._recording_capture = self.persistent_capture
+        
+        # Con captura continua el stream ya está abierto: grabar sin latencia
+        if self._recording_capture is not None:
+            self._recording_capture.start_recording(pre_roll_ms=self.get_pre_roll_ms())
+            return
+        
+        import sounddevice as sd
         
         def callback(indata, frames, time, status):
             if status:
@@ -222,47 +597,157 @@ class VoiceRecorder:
         )
         self.stream.start()
     
+    def _transcribe_partial(self):
+        """Transcribe en segundo plano el audio grabado hasta ahora y lanza el pulido especulativo"""
+        self._partial_job = None
+        if not self.recording or not self.speculative_var.get():
+            return
+        
+        # Solo una transcripción parcial a la vez: si la anterior sigue en curso, reintentar en breve
+        if self._partial_thread is not None and self._partial_thread.is_alive():
+            self._partial_job = self.root.after(1000, self._transcribe_partial)
+            return
+        
+        self._partial_count += 1
+        if self._partial_count < MAX_PARTIAL_TRANSCRIPTIONS:
+            delay = PARTIAL_TRANSCRIPTION_INTERVAL_MS * 2 ** (self._partial_count - 1)
+            self._partial_job = self.root.after(delay, self._transcribe_partial)
+        
+        if self._recording_capture is not None:
+            samples = self._recording_capture.snapshot()
+        else:
+            samples = self.audio_data[:]
+        options = self._get_transcription_options()
+        polisher = self.speculative_polisher
+        generation = self._speculation_generation
+        
+        def worker():
+            import io
+            import numpy as np
+            import scipy.io.wavfile as wav
+            try:
+                buffer = io.BytesIO()
+                wav.write(buffer, self.sample_rate, np.asarray(samples, dtype=np.float32))
+                buffer.seek(0)
+                buffer.name = "partial.wav"
+                partial_text = self.gpt_processor.transcribe_audio(
+                    buffer,
+                    model=options["transcription_model"],
+                    language=options["transcription_language"],
+                    prompt=options["transcription_prompt"]
+                )
+                # Si la grabación ya terminó, el polisher descarta este parcial
+                polisher.start(partial_text, generation=generation)
+            except Exception as e:
+                print(f"Error en la transcripción parcial: {e}")
+        
+        self._partial_thread = threading.Thread(target=worker, daemon=True)
+        self._partial_thread.start()
+    
     def stop_recording(self):
+        import numpy as np
+        import scipy.io.wavfile as wav
+        
         self.recording = False
         self.button.config(text="Iniciar Grabación")
-        self.stream.stop()
-        self.stream.close()
-        self.audio_ctrl.restore()
+        if self._partial_job is not None:
+            self.root.after_cancel(self._partial_job)
+            self._partial_job = None
+        capture, self._recording_capture = self._recording_capture, None
+        if capture is not None:
+            audio = capture.stop_recording()
+            # Si se desactivó la captura continua durante la grabación, cerrarla ahora
+            if not self.persistent_capture_var.get():
+                capture.close()
+                self.persistent_capture = None
+            self.audio_ctrl.restore_async().add_done_callback(self._report_audio_ctrl_error)
+        else:
+            self.stream.stop()
+            # Restaurar el volumen en paralelo con el cierre del stream
+            self.audio_ctrl.restore_async().add_done_callback(self._report_audio_ctrl_error)
+            self.stream.close()
+            audio = np.array(self.audio_data)
         
         # Guardar el archivo de audio
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"recording_{timestamp}.wav"
-        wav.write(filename, self.sample_rate, np.array(self.audio_data))
+        wav.write(filename, self.sample_rate, audio)
         
         # Procesar el audio
-        self.process_audio(filename)
+        try:
+            self.process_audio(filename, audio_seconds=len(audio) / self.sample_rate)
+        finally:
+            self.cursor_tracker.resume()
+    
+    def update_speculative_status(self):
+        """Muestra la tasa de acierto y el tiempo ahorrado por el pulido especulativo"""
+        metrics = self.speculative_polisher.get_metrics()
+        self.speculative_status.config(
+            text=f"Aciertos: {metrics['hit_rate']:.0%}, ahorro: {metrics['saved_seconds']:.1f} s"
+        )
+    
+    def _get_transcription_options(self):
+        """Lee las opciones de transcripción de la interfaz"""
+        # Obtener el prompt de transcripción (si hay)
+        transcription_prompt = self.transcription_prompt_text.get(1.0, tk.END).strip()
+        
+        return {
+            "transcription_model": self.transcription_model.get(),
+            "transcription_prompt": transcription_prompt or None,
+            # Obtener el idioma (si hay)
+            "transcription_language": self.language_var.get() or None,
+        }
     
-    def process_audio(self, audio_file):
+    def process_audio(self, audio_file, audio_seconds=None):
+        import pyperclip
+        from gpt_audio_processor import CURSOR_SYSTEM_MESSAGE, CURSOR_PROMPT_TEMPLATE
+        
         try:
             # Obtener valores de los campos de opciones
-            transcription_model = self.transcription_model.get()
+            options = self._get_transcription_options()
             process_model = self.process_model.get()
             
-            # Obtener el prompt de transcripción (si hay)
-            transcription_prompt = self.transcription_prompt_text.get(1.0, tk.END).strip()
-            if not transcription_prompt:
-                transcription_prompt = None
+            # Transcribir y pulir por separado para medir cada etapa
+            start = time.perf_counter()
+            transcribed_text = self.gpt_processor.transcribe_audio(
+                audio_file,
+                model=options["transcription_model"],
+                language=options["transcription_language"],
+                prompt=options["transcription_prompt"]
+            )
+            transcribed = time.perf_counter()
             
-            # Obtener el idioma (si hay)
-            language = self.language_var.get() if self.language_var.get() else None
+            if self.speculative_var.get():
+                # Reutilizar el pulido especulativo de la última transcripción parcial
+                polished_text = self.speculative_polisher.resolve(transcribed_text)
+                self.update_speculative_status()
+            else:
+                # Utilizar la librería GPTAudioProcessor con el nuevo enfoque de etiquetas
+                polished_text = self.gpt_processor.polish_text(
+                    transcribed_text,
+                    process_model=process_model,
+                    system_message=CURSOR_SYSTEM_MESSAGE,
+                    prompt_template=CURSOR_PROMPT_TEMPLATE,
+                    tag_name="text_to_cursor",
+                    clean_response=True
+                )
+            polished = time.perf_counter()
             
-            # Utilizar la librería GPTAudioProcessor con el nuevo enfoque de etiquetas y opciones avanzadas
-            polished_text = self.gpt_processor.process_audio(
-                audio_file=audio_file,
-                transcription_model=transcription_model,
-                process_model=process_model,
-                system_message="Eres un asistente que ayuda a pulir y mejorar textos para usarlos como prompts en Cursor.",
-                prompt_template="Por favor, pulir y mejorar el siguiente texto para usarlo como prompt en Cursor: {text}",
-                tag_name="text_to_cursor",
-                clean_response=True,
-                transcription_prompt=transcription_prompt,
-                transcription_language=language
-            )
+            # Guardar en el historial (un fallo aquí no debe impedir pegar el texto)
+            try:
+                self.history.add(
+                    transcribed_text,
+                    polished_text,
+                    backend=self.transcription_backend.get(),
+                    transcription_model=options["transcription_model"],
+                    process_model=process_model,
+                    audio_seconds=audio_seconds,
+                    transcription_seconds=transcribed - start,
+                    polish_seconds=polished - transcribed,
+                    total_seconds=polished - start
+                )
+            except Exception as e:
+                print(f"Error al guardar en el historial: {e}")
             
             # Copiar al portapapeles
             pyperclip.copy(polished_text)
@@ -275,21 +760,139 @@ class VoiceRecorder:
             
             # Verificar si hay coordenadas y ejecutar automáticamente la secuencia
             if self.x_entry.get() and self.y_entry.get():
-                self.root.after(1000, self.execute_sequence)  # Esperar 1 segundo antes de ejecutar
+                self.execute_sequence(text=polished_text)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al procesar el audio: {str(e)}")
     
-    def update_cursor_position(self):
-        """Actualiza la posición del cursor en tiempo real"""
+    def open_history(self):
+        """Abre el panel de búsqueda del historial de dictados"""
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.lift()
+            return
+        
+        self.history_window = tk.Toplevel(self.root)
+        self.history_window.title("Historial de dictados")
+        self.history_window.geometry("600x450")
+        self._history_entries = []
+        self._history_search_job = None
+        
+        search_frame = tk.Frame(self.history_window)
+        search_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        tk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT, padx=5)
+        
+        self.history_query = StringVar(self.history_window)
+        search_entry = tk.Entry(search_frame, textvariable=self.history_query)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.focus_set()
+        self.history_query.trace_add("write", lambda *args: self._schedule_history_search())
+        
+        list_container = tk.Frame(self.history_window)
+        list_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        self.history_list = tk.Listbox(list_container, activestyle=tk.NONE)
+        self.history_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = Scrollbar(list_container, command=self.history_list.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.history_list.config(yscrollcommand=scrollbar.set)
+        self.history_list.bind("<<ListboxSelect>>", lambda event: self._show_history_entry())
+        self.history_list.bind("<Double-Button-1>", lambda event: self.resend_history_entry(paste=True))
+        search_entry.bind("<Return>", lambda event: self.resend_history_entry(paste=True))
+        
+        self.history_preview = Text(self.history_window, height=6, wrap=tk.WORD, state=tk.DISABLED)
+        self.history_preview.pack(fill=tk.X, padx=10, pady=5)
+        
+        self.history_details = tk.Label(self.history_window, text="", font=("Arial", 9))
+        self.history_details.pack(padx=10)
+        
+        buttons_frame = tk.Frame(self.history_window)
+        buttons_frame.pack(pady=5)
+        
+        tk.Button(buttons_frame, text="Copiar", width=15,
+                  command=lambda: self.resend_history_entry(paste=False)).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Copiar y pegar", width=15,
+                  command=lambda: self.resend_history_entry(paste=True)).pack(side=tk.LEFT, padx=5)
+        
+        self._search_history()
+    
+    def _schedule_history_search(self):
+        # Esperar a que el usuario deje de escribir antes de consultar
+        if self._history_search_job is not None:
+            self.history_window.after_cancel(self._history_search_job)
+        self._history_search_job = self.history_window.after(150, self._search_history)
+    
+    def _search_history(self):
+        self._history_search_job = None
         try:
-            x, y = pyautogui.position()
-            self.coords_label.config(text=f"Posición del cursor: X: {x}, Y: {y}")
+            self._history_entries = self.history.search(self.history_query.get(), limit=100)
         except Exception as e:
-            print(f"Error al obtener posición del cursor: {e}")
+            messagebox.showerror("Error", f"Error al buscar en el historial: {str(e)}", parent=self.history_window)
+            return
         
-        # Actualizar cada 100ms
-        self.root.after(100, self.update_cursor_position)
+        self.history_list.delete(0, tk.END)
+        for entry in self._history_entries:
+            created = datetime.fromtimestamp(entry["created_at"]).strftime("%d/%m %H:%M")
+            summary = " ".join(entry["polished"].split())
+            self.history_list.insert(tk.END, f"{created}  {summary[:90]}")
+        if self._history_entries:
+            self.history_list.selection_set(0)
+        self._show_history_entry()
+    
+    def _selected_history_entry(self):
+        selection = self.history_list.curselection()
+        if not selection:
+            return None
+        return self._history_entries[selection[0]]
+    
+    def _show_history_entry(self):
+        entry = self._selected_history_entry()
+        self.history_preview.config(state=tk.NORMAL)
+        self.history_preview.delete(1.0, tk.END)
+        if entry is None:
+            self.history_details.config(text="")
+        else:
+            self.history_preview.insert(tk.END, entry["polished"])
+            timings = [
+                f"{label}: {entry[key]:.2f} s"
+                for label, key in (("transcripción", "transcription_seconds"),
+                                   ("pulido", "polish_seconds"),
+                                   ("total", "total_seconds"))
+                if entry[key] is not None
+            ]
+            self.history_details.config(
+                text=f"{entry['transcription_model']} + {entry['process_model']}  |  " + ", ".join(timings)
+            )
+        self.history_preview.config(state=tk.DISABLED)
+    
+    def resend_history_entry(self, paste=True):
+        """
+        Copia al portapapeles el texto pulido seleccionado en el historial y,
+        opcionalmente, ejecuta la secuencia para pegarlo sin volver a grabar.
+        
+        Args:
+            paste: Si se debe ejecutar la secuencia tras copiar (requiere coordenadas).
+        """
+        import pyperclip
+        
+        entry = self._selected_history_entry()
+        if entry is None:
+            return
+        pyperclip.copy(entry["polished"])
+        
+        if paste and self.x_entry.get() and self.y_entry.get():
+            self.execute_sequence(text=entry["polished"])
+    
+    def update_cursor_position(self, x, y):
+        """Muestra la nueva posición del cursor (solo se llama cuando cambia)"""
+        self.coords_label.config(text=f"Posición del cursor: X: {x}, Y: {y}")
+    
+    def is_window_visible(self):
+        """Indica si la ventana principal está visible (no minimizada ni oculta)"""
+        try:
+            return self.root.state() != "iconic" and bool(self.root.winfo_viewable())
+        except tk.TclError:
+            return False
     
     def toggle_capture(self):
         """Activa/desactiva el modo de captura de coordenadas"""
@@ -323,8 +926,13 @@ class VoiceRecorder:
         if hasattr(self, 'overlay') and self.overlay.winfo_exists():
             self.overlay.destroy()
     
-    def execute_sequence(self):
-        """Ejecuta una secuencia de comandos usando PC_Controller"""
+    def execute_sequence(self, text=None):
+        """
+        Ejecuta la secuencia seleccionada con el motor de secuencias, fuera del hilo de la interfaz.
+        
+        Args:
+            text: Texto que se espera en el portapapeles antes de pegar (opcional).
+        """
         try:
             # Verificar si los campos están vacíos
             if not self.x_entry.get() or not self.y_entry.get():
@@ -339,35 +947,59 @@ class VoiceRecorder:
                 messagebox.showerror("Error", "Las coordenadas deben ser números enteros")
                 return
             
-            # Ejecutar secuencia: Enter -> Clic -> Enter
-            self.pc_ctrl.enter()
-            
-            # Pequeña pausa para dar tiempo a que se procese la acción
-            time.sleep(0.5)
-            
-            # Clic en las coordenadas almacenadas
-            self.pc_ctrl.click_izquierdo(x, y)
-            
-            # Pequeña pausa para dar tiempo a que se procese la acción
-            time.sleep(0.5)
+            variables = {"x": x, "y": y}
+            if text is not None:
+                variables["text"] = text
             
-            # Pegar texto del portapapeles
-            self.pc_ctrl.pegar()
-            
-            # Pequeña pausa para dar tiempo a que se procese la acción
-            time.sleep(0.5)
-            
-            # Presionar Enter nuevamente
-            self.pc_ctrl.enter()
+            started = self.macro_engine.run_async(
+                self.macros[self.macro_var.get()],
+                variables,
+                on_done=lambda elapsed, error: self._macro_results.put((elapsed, error))
+            )
+            if not started:
+                return
             
-            messagebox.showinfo("Éxito", "Secuencia ejecutada correctamente")
+            self.execute_button.config(state=tk.DISABLED)
+            self.root.after(20, self._check_sequence_done)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al ejecutar la secuencia: {str(e)}")
     
+    def _check_sequence_done(self):
+        # El resultado llega desde el hilo de trabajo; la interfaz solo se toca aquí
+        try:
+            elapsed, error = self._macro_results.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self._check_sequence_done)
+            return
+        
+        self.execute_button.config(state=tk.NORMAL)
+        if error is not None:
+            messagebox.showerror("Error", f"Error al ejecutar la secuencia: {str(error)}")
+        else:
+            messagebox.showinfo("Éxito", f"Secuencia ejecutada correctamente ({elapsed:.2f} s)")
+    
     def run(self):
         self.root.mainloop()
+        if getattr(self, 'persistent_capture', None) is not None:
+            self.persistent_capture.close()
+        if getattr(self, '_audio_ctrl', None) is not None:
+            self._audio_ctrl.close()
+        if getattr(self, '_speculative_polisher', None) is not None:
+            self._speculative_polisher.close()
+        if getattr(self, '_history', None) is not None:
+            self._history.close()
+
+def _report_first_frame(app):
+    """Informa del primer frame dibujado y cierra la ventana (usado por startup_benchmark.py)"""
+    app.root.wait_visibility()
+    app.root.update_idletasks()
+    print(f"FIRST_FRAME {time.time():.6f}", flush=True)
+    app.root.destroy()
 
 if __name__ == "__main__":
     app = VoiceRecorder()
-    app.run() 
\ No newline at end of file
+    if os.getenv("VOICE_TO_CURSOR_STARTUP_PROBE"):
+        _report_first_frame(app)
+    else:
+        app.run() 
\ No newline at end of file